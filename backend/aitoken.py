@@ -1,20 +1,40 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
-from flask import send_from_directory
-from PyPDF2 import PdfReader
-from openai import OpenAI
+from flask import send_file
 import subprocess
 import shutil
 import os
-import firebase_admin
-from firebase_admin import credentials, storage, firestore
 from dotenv import load_dotenv
-import requests
-import time
 import uuid
 from datetime import datetime
 import base64
+import hashlib
+import io
+import json
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from jobs import BatchQueue, JobQueue, QueueFullError
+from pdf_cache import PdfTextCache, document_hash
+from pdf_extract import extract_text
+from chunking import QUESTION_LINE, chunk_work, estimate_tokens, generate_in_chunks, merge_quizzes
+from result_cache import GenerationCache, generation_key
+from quiz_stream import QuestionStreamer, format_sse
+from qti_builder import QtiBuildError, build_qti_zip
+from quiz_parser import check_quiz, parse_questions, render_quiz, repair_quiz
+from question_bank import BankPlan, QuestionBank
+from artifacts import ArtifactStore
+from migration_poller import MigrationPoller
+from quiz_store import QuizStore, stored_quiz_text
+from firebase_clients import get_db
+from prompt_templates import TemplateFile
+from http_clients import client_stats, get_canvas_rate_limiter, get_canvas_session, get_openai_client
+from rate_limits import RateLimiter
+from metrics import (BYTES_BUCKETS, PAGE_BUCKETS, TOKEN_BUCKETS, MetricsRegistry, bind_context, current_request_id,
+                     log_event, new_request_id, reset_request_id, set_request_id, timed_span)
 
 # === Flask App Initialization ===
 app = Flask(__name__)
@@ -28,12 +48,20 @@ if not openai_api_key:
     raise ValueError("⚠️  OPENAI_API_KEY not found in .env file!")
 
 # === Firebase Setup ===
-cred = credentials.Certificate("firebase-adminsdk.json")
-firebase_admin.initialize_app(cred, {
-    'storageBucket': 'canvas-ai-2f5b6.appspot.com'
-})
-bucket = storage.bucket()
-db = firestore.client()
+# Firebase Admin is initialized by get_db() on the first Firestore lookup, not at import;
+# the lambda looks get_db up at call time so the benchmark can swap in a stand-in.
+# Quiz lookups go through a read-through cache; writes must use quiz_store.save to invalidate it
+quiz_store = QuizStore(
+    lambda: get_db(),
+    max_entries=int(os.getenv("QUIZ_CACHE_SIZE", "1024")),
+    ttl=int(os.getenv("QUIZ_CACHE_TTL_SECONDS", "60"))
+)
+MAX_BATCH_QUIZ_IDS = 100
+
+# Generated quizzes are only written to Firestore when SAVE_QUIZZES is on, and then
+# on a background thread so no response waits on Firebase Admin or the write
+SAVE_QUIZZES = os.getenv("SAVE_QUIZZES", "").lower() in ("1", "true", "yes")
+quiz_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quiz-store") if SAVE_QUIZZES else None
 
 # === Define Path to Public Folder for Firebase Hosting ===
 PUBLIC_FOLDER = "public"
@@ -43,6 +71,116 @@ QUIZZES_FOLDER = os.path.join(PUBLIC_FOLDER, "quizzes")
 if not os.path.exists(QUIZZES_FOLDER):
     os.makedirs(QUIZZES_FOLDER)
 
+# === Per-Quiz Artifacts ===
+# Each quiz gets its own folder, so any number of workers can generate and serve quizzes at once
+artifact_store = ArtifactStore(
+    os.getenv("ARTIFACT_DIR", "artifacts"),
+    max_bytes=int(os.getenv("ARTIFACT_MAX_MB", "512")) * 1024 * 1024,
+    max_age=int(os.getenv("ARTIFACT_MAX_AGE_SECONDS", str(24 * 3600)))
+)
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8080").rstrip("/")
+
+# === Canvas Import Poller ===
+# One event loop follows every in-flight Canvas import instead of a sleeping thread per request
+migration_poller = MigrationPoller(
+    get_canvas_session,
+    max_concurrency=int(os.getenv("CANVAS_POLL_CONCURRENCY", "4")),
+    timeout=int(os.getenv("CANVAS_POLL_MAX_SECONDS", "600"))
+)
+
+# === Background Jobs ===
+# Size QUIZ_WORKERS to the OpenAI rate limits; QUIZ_QUEUE_DEPTH jobs may wait on top of that.
+job_queue = JobQueue(
+    workers=int(os.getenv("QUIZ_WORKERS", "4")),
+    max_depth=int(os.getenv("QUIZ_QUEUE_DEPTH", "32")),
+    ttl=int(os.getenv("QUIZ_JOB_TTL_SECONDS", "3600"))
+)
+
+# === Batch Generation ===
+# Items of every batch share BATCH_WORKERS slots; the rate limiters pace their OpenAI and Canvas calls
+batch_queue = BatchQueue(
+    workers=int(os.getenv("BATCH_WORKERS", "4")),
+    max_items=int(os.getenv("BATCH_MAX_ITEMS", "50")),
+    max_pending=int(os.getenv("BATCH_QUEUE_DEPTH", "200")),
+    ttl=int(os.getenv("QUIZ_JOB_TTL_SECONDS", "3600"))
+)
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_MB", "512")) * 1024 * 1024
+
+# === PDF Extraction ===
+# Long documents are split across a process pool; the budgets cap latency on huge uploads.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count()
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0")) or None
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "0")) or None
+
+# === Extracted Text Cache ===
+# Repeat uploads of the same PDF skip PyPDF2; set PDF_CACHE_DIR to keep entries across restarts.
+pdf_text_cache = PdfTextCache(
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    disk_dir=os.getenv("PDF_CACHE_DIR") or None
+)
+
+# === Quiz Generation ===
+QUIZ_MODEL = "gpt-4.1"
+QUIZ_MAX_TOKENS = 5000
+# Text above QUIZ_CHUNK_TOKENS is split; QUIZ_CHUNK_CONCURRENCY chunk prompts run at once
+QUIZ_CHUNK_TOKENS = int(os.getenv("QUIZ_CHUNK_TOKENS", "12000"))
+QUIZ_CHUNK_CONCURRENCY = int(os.getenv("QUIZ_CHUNK_CONCURRENCY", "4"))
+
+# Every OpenAI call waits here first; 0 leaves a limit off (set them to the account's limits)
+openai_rate_limiter = RateLimiter(
+    requests_per_minute=int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "0")),
+    tokens_per_minute=int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "0"))
+)
+
+# Malformed or missing questions are re-requested up to QUIZ_REPAIR_ROUNDS times (0 turns it off)
+QUIZ_REPAIR_ROUNDS = int(os.getenv("QUIZ_REPAIR_ROUNDS", "1"))
+
+# === Question Bank ===
+# Generated questions are kept per course; an empty QUESTION_BANK_DIR turns the bank off.
+# Near-duplicates are re-requested, and quizzes on material the bank covers reuse stored questions.
+QUESTION_BANK_DIR = os.getenv("QUESTION_BANK_DIR", "question_bank")
+question_bank = QuestionBank(
+    QUESTION_BANK_DIR,
+    reuse_fraction=float(os.getenv("QUESTION_BANK_REUSE_FRACTION", "0.5")),
+    duplicate_similarity=float(os.getenv("QUESTION_BANK_DUPLICATE_SIMILARITY", "0.85")),
+    cover_similarity=float(os.getenv("QUESTION_BANK_COVER_SIMILARITY", "0.8")),
+    max_questions=int(os.getenv("QUESTION_BANK_MAX_QUESTIONS", "2000"))
+) if QUESTION_BANK_DIR else None
+
+# Bump when the prompt wording changes so cached generations are not reused
+PROMPT_VERSION = 2
+# Read once at start-up; edits to quiz.txt are picked up within a second without a restart
+sample_quiz_template = TemplateFile("quiz.txt")
+
+# === Generation Cache ===
+generation_cache = GenerationCache(
+    max_entries=int(os.getenv("GENERATION_CACHE_SIZE", "256")),
+    ttl=int(os.getenv("GENERATION_CACHE_TTL_SECONDS", str(24 * 3600)))
+)
+
+# === Metrics ===
+# Exported on /metrics in the Prometheus text format; each worker process keeps its own numbers
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    "quiz_stage_seconds", "Time spent in each quiz pipeline stage.", labelnames=("stage",))
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_seconds", "Time to build each HTTP response.", labelnames=("endpoint", "method", "status"))
+UPLOAD_BYTES = metrics.histogram("quiz_upload_bytes", "Size of uploaded PDFs.", buckets=BYTES_BUCKETS)
+PDF_PAGES = metrics.histogram("quiz_pdf_pages", "Pages in each extracted PDF.", buckets=PAGE_BUCKETS)
+OPENAI_TOKENS = metrics.histogram(
+    "openai_tokens", "Tokens used by each OpenAI completion.", buckets=TOKEN_BUCKETS, labelnames=("kind",))
+metrics.register_stats("quiz_pdf_text_cache", pdf_text_cache.stats)
+metrics.register_stats("quiz_generation_cache", generation_cache.stats)
+metrics.register_stats("quiz_store_cache", quiz_store.stats)
+metrics.register_stats("quiz_jobs", job_queue.stats)
+metrics.register_stats("canvas_migrations", migration_poller.stats)
+metrics.register_stats("http_clients", client_stats)
+metrics.register_stats("quiz_batches", batch_queue.stats)
+metrics.register_stats("openai_rate_limit", openai_rate_limiter.stats)
+metrics.register_stats("canvas_rate_limit", lambda: get_canvas_rate_limiter().stats())
+if question_bank is not None:
+    metrics.register_stats("quiz_question_bank", question_bank.stats)
+
 # === Helper Functions ===
 def save_file_to_public(local_path, dest_name):
     """Saves a file to public/quizzes/ for Firebase Hosting."""
@@ -52,13 +190,6 @@ def save_file_to_public(local_path, dest_name):
     print(f"✅ File uploaded to: {file_url}")
     return file_url
 
-def check_text2qti():
-    try:
-        result = subprocess.run(["where", "text2qti"], capture_output=True, text=True)
-        return result.returncode == 0
-    except FileNotFoundError:
-        return False
-
 def run_firebase_deploy():
     """Runs firebase deploy using the correct path."""
     try:
@@ -106,17 +237,21 @@ def clean_quiz_text(quiz_text):
     return cleaned_text
 
 
-def generate_quiz_from_text(text: str, question_counts: dict, courseId: str, instructions: str = "") -> str:
-    """Generate quiz questions from the given text using OpenAI."""
-    with open("quiz.txt", "r", encoding="utf-8") as file:
-        sample_quiz = file.read()
+def prompt_template_hash():
+    """Fingerprint of the prompt template and sample quiz, for generation cache keys."""
+    return hashlib.sha256(f"v{PROMPT_VERSION}:{sample_quiz_template.digest()}".encode("utf-8")).hexdigest()
 
-    client = OpenAI(api_key=openai_api_key)
-    
+
+def build_quiz_prompt(text: str, question_counts: dict, courseId: str, instructions: str, sample_quiz: str,
+                      avoid_questions=()) -> str:
+    """Build the user prompt asking for question_counts questions about text.
+
+    avoid_questions lists questions already in the quiz that must not be repeated.
+    """
     # Format the question counts for the prompt
     question_types = []
     for q_type, count in question_counts.items():
-        if count > 0:
+        if int(count or 0) > 0:
             question_types.append(f"{count} {q_type} questions")
     
     question_types_str = ", ".join(question_types)
@@ -134,25 +269,215 @@ For select all that apply, use brackets for the answer choices and add an asteri
     prompt += f"""
 The output should exactly match the formatting from the following quiz sample:
 {sample_quiz}
-In the output don't include any text other than the questions and the answer choices 
+In the output don't include any text other than the questions and the answer choices """
+    if avoid_questions:
+        prompt += "\nDo not repeat any of these questions:\n" + "\n".join(f"- {q}" for q in avoid_questions)
+    prompt += f"""
 Text to generate quiz from:
 {text}"""
-    
+    return prompt
+
+
+def request_quiz_completion(prompt: str) -> str:
+    """Send one quiz prompt to OpenAI and return the model's text."""
+    client = get_openai_client(openai_api_key)
+    _wait_for_openai(prompt)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",
+        with timed_span(STAGE_SECONDS, "openai") as span:
+            response = client.chat.completions.create(
+                model=QUIZ_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that generates educational quizzes."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+                max_tokens=QUIZ_MAX_TOKENS
+            )
+            span.update(_record_usage(response.usage))
+
+        return response.choices[0].message.content
+    except Exception as e:
+        print(f"Error generating quiz: {str(e)}")
+        raise
+
+
+def stream_quiz_completion(prompt: str):
+    """Send one quiz prompt to OpenAI and yield the model's text as it arrives."""
+    client = get_openai_client(openai_api_key)
+    _wait_for_openai(prompt)
+    with timed_span(STAGE_SECONDS, "openai", stream=True) as span:
+        stream = client.chat.completions.create(
+            model=QUIZ_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that generates educational quizzes."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7,
-            max_tokens=5000
+            max_tokens=QUIZ_MAX_TOKENS,
+            stream=True,
+            stream_options={"include_usage": True}
         )
-        
-        return response.choices[0].message.content
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            # The final chunk carries the usage for the whole completion
+            if getattr(chunk, "usage", None):
+                span.update(_record_usage(chunk.usage))
+
+
+def _wait_for_openai(prompt):
+    """Block until the OpenAI rate limits allow another completion for prompt."""
+    # OpenAI counts max_tokens against the tokens-per-minute limit up front, so reserve them too
+    waited = openai_rate_limiter.acquire(estimate_tokens(prompt) + QUIZ_MAX_TOKENS)
+    if waited:
+        log_event("throttled", limiter="openai", waitedMs=round(waited * 1000, 2))
+
+
+def _record_usage(usage):
+    """Record an OpenAI usage block in the token histogram; returns it as log fields."""
+    if usage is None:
+        return {}
+    OPENAI_TOKENS.observe(usage.prompt_tokens, kind="prompt")
+    OPENAI_TOKENS.observe(usage.completion_tokens, kind="completion")
+    return {"promptTokens": usage.prompt_tokens, "completionTokens": usage.completion_tokens}
+
+
+def load_sample_quiz() -> str:
+    return sample_quiz_template.text()
+
+
+def generate_quiz_from_text(text: str, question_counts: dict, courseId: str, instructions: str = "",
+                            reuse: bool = True) -> str:
+    """Generate quiz questions from the given text using OpenAI.
+
+    Text longer than QUIZ_CHUNK_TOKENS is split into chunks that are sent
+    concurrently, each asking for its share of the questions. With reuse,
+    part of the quiz may come from the course's question bank instead.
+    """
+    generate = _chunked_generator(text, courseId, instructions, load_sample_quiz())
+    plan = plan_quiz(courseId, text, question_counts, reuse)
+    quiz_text = generate(plan.remaining, plan.avoid) if plan.needs_generation else ""
+    return repair_quiz_text(quiz_text, plan, generate)
+
+
+def plan_quiz(courseId, text, question_counts, reuse=True):
+    """Ask the question bank which questions it supplies for this request; returns a BankPlan."""
+    if question_bank is None:
+        return BankPlan(remaining=question_counts)
+    try:
+        with timed_span(STAGE_SECONDS, "bank") as span:
+            plan = question_bank.plan(courseId, text, question_counts, reuse)
+            span["reused"] = len(plan.reused)
     except Exception as e:
-        print(f"Error generating quiz: {str(e)}")
-        raise
+        print(f"⚠️ Warning: Question bank unavailable, generating every question. Reason: {e}")
+        return BankPlan(remaining=question_counts)
+    if plan.reused:
+        print(f"♻️ Reusing {len(plan.reused)} question(s) from the {courseId} question bank")
+    return plan
+
+
+def _chunked_generator(text, courseId, instructions, sample_quiz):
+    """generate(counts, avoid_questions=()) -> quiz text with counts questions about text."""
+
+    def generate(counts, avoid_questions=()):
+        def generate_chunk(chunk_text, chunk_counts):
+            prompt = build_quiz_prompt(chunk_text, chunk_counts, courseId, instructions, sample_quiz, avoid_questions)
+            return clean_quiz_text(request_quiz_completion(prompt))
+
+        return generate_in_chunks(
+            text,
+            counts,
+            bind_context(generate_chunk),
+            max_chunk_tokens=QUIZ_CHUNK_TOKENS,
+            concurrency=QUIZ_CHUNK_CONCURRENCY
+        )
+
+    return generate
+
+
+def repair_quiz_text(quiz_text, plan, generate):
+    """Check generated quiz text against plan.remaining and re-request only the bad or missing questions.
+
+    Near-duplicates of banked questions count as bad. The reused questions
+    come first and the result is rewritten in the exact quiz.txt format,
+    numbered from 1.
+    """
+    with timed_span(STAGE_SECONDS, "repair") as span:
+        generated, summary = repair_quiz(quiz_text, plan.remaining, generate, max_rounds=QUIZ_REPAIR_ROUNDS,
+                                         check=plan.check, avoid=plan.avoid)
+        span.update(summary)
+    if summary["invalid"] or summary["regenerated"]:
+        print(f"🔧 Replaced {summary['invalid']} malformed or repeated question(s); "
+              f"re-requested {summary['regenerated']} in {summary['rounds']} round(s).")
+    questions = plan.finish(generated)
+    if plan.topped_up:
+        print(f"♻️ Filled {plan.topped_up} missing question(s) from the question bank")
+    elif summary["missing"]:
+        print(f"⚠️ Warning: Quiz is still short of {summary['missing']}")
+    return render_quiz(questions)
+
+
+def stream_quiz_from_text(text: str, question_counts: dict, courseId: str, instructions: str = "",
+                          reuse: bool = True):
+    """Streaming counterpart of generate_quiz_from_text.
+
+    Yields ("question", text) for each reused question, then for each new
+    question as soon as the model has finished it, in document order, then
+    ("quiz", text) after the same validation and repair
+    generate_quiz_from_text applies. Replacements for malformed or repeated
+    questions only appear in that final text.
+    """
+    sample_quiz = load_sample_quiz()
+    plan = plan_quiz(courseId, text, question_counts, reuse)
+    for number, question in enumerate(plan.reused, 1):
+        yield "question", question.render(number)
+
+    work = chunk_work(text, plan.remaining, QUIZ_CHUNK_TOKENS) if plan.needs_generation else []
+    # New questions are numbered after the reused ones
+    renumber = len(work) > 1 or bool(plan.reused)
+
+    def stream_chunk(chunk_text, chunk_counts, events):
+        try:
+            prompt = build_quiz_prompt(chunk_text, chunk_counts, courseId, instructions, sample_quiz, plan.avoid)
+            streamer = QuestionStreamer()
+            raw = []
+            for delta in stream_quiz_completion(prompt):
+                raw.append(delta)
+                for question in streamer.feed(delta):
+                    events.put(("question", question))
+            for question in streamer.close():
+                events.put(("question", question))
+            events.put(("done", clean_quiz_text("".join(raw))))
+        except Exception as e:
+            events.put(("error", e))
+
+    # Every chunk streams concurrently; questions are forwarded chunk by chunk so they stay in order
+    executor = ThreadPoolExecutor(max_workers=max(1, min(QUIZ_CHUNK_CONCURRENCY, len(work))))
+    try:
+        queues = [queue.Queue() for _ in work]
+        run_chunk = bind_context(stream_chunk)
+        for (chunk_text, chunk_counts), events in zip(work, queues):
+            executor.submit(run_chunk, chunk_text, chunk_counts, events)
+        results = []
+        number = len(plan.reused)
+        for events in queues:
+            while True:
+                kind, value = events.get()
+                if kind == "error":
+                    raise value
+                if kind == "done":
+                    results.append(value)
+                    break
+                number += 1
+                if renumber:
+                    value = QUESTION_LINE.sub(f"{number}. ", value, count=1)
+                yield "question", value
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    # results is empty when the bank supplied every question
+    quiz_text = results[0] if len(results) == 1 and not renumber else merge_quizzes(results)
+    generate = _chunked_generator(text, courseId, instructions, sample_quiz)
+    yield "quiz", repair_quiz_text(quiz_text, plan, generate)
 
 # === New Route: Get Quiz Text ===
 @app.route("/get-quiz-text", methods=["GET"])
@@ -162,197 +487,721 @@ def get_quiz_text_by_id():
         if not quiz_id:
             return jsonify({"error": "Quiz ID is required"}), 400
 
-        quiz_ref = db.collection("quizzes").document(quiz_id)
-        quiz_doc = quiz_ref.get()
-
-        if not quiz_doc.exists:
+        quiz_data = quiz_store.get(quiz_id)
+        if quiz_data is None:
             return jsonify({"error": "Quiz not found"}), 404
 
-        quiz_data = quiz_doc.to_dict()
-        return jsonify({"text": quiz_data.get("text", "")})
+        return jsonify({"text": stored_quiz_text(quiz_data, "text")})
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# === Quiz Pipeline ===
+class QuizPipelineError(Exception):
+    """Raised by a pipeline stage; carries the HTTP status the route should return."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def _no_report(stage, progress=None):
+    pass
+
+
+def extract_pdf_text(source):
+    """Extract the text of a PDF (path or bytes) within the configured page/char budget."""
+    extracted = extract_text(
+        source,
+        max_pages=PDF_MAX_PAGES,
+        max_chars=PDF_MAX_CHARS,
+        workers=PDF_EXTRACT_WORKERS
+    )
+    PDF_PAGES.observe(extracted.pages_total)
+    if extracted.truncated:
+        print(f"⚠️ Extraction stopped after {extracted.pages_read} of {extracted.pages_total} pages "
+              f"({len(extracted.text)} characters).")
+    return extracted.text
+
+
+def convert_to_qti(quiz_text):
+    """Build the QTI package for quiz_text in memory; returns the zip bytes or None."""
+    try:
+        with timed_span(STAGE_SECONDS, "package"):
+            qti_zip = build_qti_zip(quiz_text)
+    except QtiBuildError as e:
+        print(f"❌ Error building QTI package: {e}")
+        return None
+    print("✅ QTI package successfully created.")
+    return qti_zip
+
+
+def upload_qti_to_canvas(qti_zip, canvas_course_id, report=_no_report, zip_name="output.zip"):
+    """Start importing the QTI zip bytes into a Canvas course.
+
+    Returns the MigrationStatus the background poller keeps up to date.
+    """
+    canvas_api_url = os.getenv("CANVAS_API_URL", "https://k12.instructure.com")
+    canvas_api_token = os.getenv("CANVAS_API_TOKEN")
+    if not canvas_course_id:
+        raise ValueError("Canvas course ID is missing")
+    if not canvas_api_token:
+        raise ValueError("Canvas API token is not set")
+
+    init_url = f"{canvas_api_url}/api/v1/courses/{canvas_course_id}/content_migrations"
+    payload = {
+        "migration_type": "qti_converter",
+        "pre_attachment[name]": zip_name
+    }
+    headers = {"Authorization": f"Bearer {canvas_api_token}"}
+    canvas = get_canvas_session()
+    response = canvas.post(init_url, data=payload, headers=headers)
+    response.raise_for_status()
+    migration = response.json()
+    upload_url = migration.get("pre_attachment", {}).get("upload_url")
+    upload_params = migration.get("pre_attachment", {}).get("upload_params")
+    progress_url = migration.get("progress_url")
+    print("Content migration initiated.")
+
+    report("canvas_upload")
+    files = {"file": (zip_name, qti_zip, "application/zip")}
+    upload_response = canvas.post(upload_url, data=upload_params, files=files)
+    if upload_response.status_code in (301, 302):
+        confirm_url = upload_response.headers.get("Location")
+        if confirm_url:
+            confirm_response = canvas.get(confirm_url, headers=headers)
+            confirm_response.raise_for_status()
+            print("File upload confirmed.")
+    else:
+        upload_response.raise_for_status()
+        print("File uploaded successfully.")
+
+    # The background poller follows the import so this request does not have to wait for it
+    print("Processing QTI file...")
+    report("canvas_import")
+    if not progress_url.startswith("http"):
+        progress_url = f"{canvas_api_url}{progress_url}"
+    return migration_poller.track(progress_url, headers, on_done=bind_context(_record_canvas_import))
+
+
+def _record_canvas_import(status):
+    seconds = status.finished_at - datetime.fromisoformat(status.created_at).timestamp()
+    STAGE_SECONDS.observe(seconds, stage="canvas_import")
+    log_event("span", stage="canvas_import", durationMs=round(seconds * 1000, 2), outcome=status.state,
+              polls=status.polls, migrationId=status.id)
+
+
+def _extract_uploaded_pdf(pdf_bytes):
+    """Extract the text of an uploaded PDF straight from memory."""
+    try:
+        return extract_pdf_text(pdf_bytes)
+    except Exception as e:
+        print(f"Error reading PDF: {str(e)}")
+        raise QuizPipelineError(f"Error reading PDF: {str(e)}")
+
+
+def load_document_text(pdf_bytes, doc_hash):
+    """Text of an uploaded PDF, from the cache when this document was seen before."""
+    # The extraction budgets are part of the key so changing them never serves stale text
+    text_key = f"{doc_hash}-{PDF_MAX_PAGES or 0}-{PDF_MAX_CHARS or 0}"
+    with timed_span(STAGE_SECONDS, "extract") as span:
+        text = pdf_text_cache.get(text_key)
+        span["cached"] = text is not None
+        if text is None:
+            text = _extract_uploaded_pdf(pdf_bytes)
+            pdf_text_cache.put(text_key, text)
+        else:
+            print(f"✅ Reusing extracted text for document {doc_hash[:12]}")
+        span["chars"] = len(text)
+    return text
+
+
+def quiz_cache_key(data, doc_hash):
+    return generation_key(doc_hash, data.get('questionCounts', {}), data.get('instructions', ''),
+                          data.get('courseId'), QUIZ_MODEL, prompt_template_hash())
+
+
+def quiz_is_complete(quiz_text, question_counts):
+    """Whether quiz_text has valid questions and every requested one; only complete quizzes are cached."""
+    check = check_quiz(parse_questions(quiz_text), question_counts)
+    return bool(check.keep) and not check.missing
+
+
+def require_questions(quiz_text):
+    if not any(question.valid for question in parse_questions(quiz_text)):
+        raise QuizPipelineError("The model returned no usable quiz questions", 502)
+
+
+def finish_quiz(data, quiz_text, report=_no_report):
+    """Package generated quiz text, send it to Canvas and build the response payload."""
+    with timed_span(STAGE_SECONDS, "clean"):
+        quiz_text = clean_quiz_text(quiz_text)
+
+    # Generate unique quiz ID; every artifact of this quiz is stored under it
+    quiz_id = str(uuid.uuid4())
+    artifact_store.put(quiz_id, "quiz.txt", quiz_text.encode("utf-8"))
+
+    # === Step 4: Convert to QTI ===
+    report("packaging", 70)
+    qti_url = ""
+    canvas_migration = None
+    qti_zip = convert_to_qti(quiz_text)
+    if qti_zip:
+        artifact_store.put(quiz_id, "qti.zip", qti_zip)
+        qti_url = f"{PUBLIC_BASE_URL}/quizzes/{quiz_id}/qti.zip"
+        print(f"✅ QTI ZIP accessible at: {qti_url}")
+        report("canvas_upload", 80)
+        try:
+            with timed_span(STAGE_SECONDS, "canvas_upload", zipBytes=len(qti_zip)):
+                migration = upload_qti_to_canvas(qti_zip, data.get("canvasCourseId"), report)
+            canvas_migration = migration.to_dict()
+            canvas_migration["statusUrl"] = f"/migrations/{migration.id}"
+        except Exception as e:
+            print(f"⚠️ Warning: Skipping Canvas upload. Reason: {e}")
+
+    payload = {
+        'quizId': quiz_id,
+        'quizText': quiz_text,
+        'courseId': data.get('courseId'),
+        'materials': data.get('materials', []),
+        'questionCounts': data.get('questionCounts', {}),
+        'instructions': data.get('instructions', ''),
+        'createdAt': datetime.now().isoformat(),
+        'qtiUrl': qti_url,
+        'canvasMigration': canvas_migration,
+        'fileName': data.get('fileName')
+    }
+    # Store the quiz so /get-quiz-text and the /api quiz lookups can find it by quizId later;
+    # the Canvas import status changes after this and is served by /migrations instead
+    if quiz_writer is not None:
+        quiz_writer.submit(bind_context(save_quiz), quiz_id,
+                           {key: value for key, value in payload.items() if key != 'canvasMigration'})
+    return payload
+
+
+def save_quiz(quiz_id, quiz_data):
+    try:
+        quiz_store.save(quiz_id, quiz_data)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not save quiz {quiz_id} to Firestore. Reason: {e}")
+
+
+def run_quiz_pipeline(data, pdf_bytes, doc_hash=None, report=_no_report):
+    """Run every stage of quiz generation for one uploaded PDF.
+
+    data holds the request fields (everything except the file itself).
+    report(stage, progress) is called as the pipeline moves between stages so
+    background jobs can expose where they are. Returns the response payload.
+    """
+    instructions = data.get('instructions', '')
+    courseId = data.get('courseId')
+
+    # Reuse the text of a document we have already extracted
+    report("extracting", 5)
+    doc_hash = doc_hash or document_hash(pdf_bytes)
+    text = load_document_text(pdf_bytes, doc_hash)
+
+    # Generate quiz using the extracted text; identical requests share one OpenAI call
+    report("generating", 20)
+    question_counts = data.get('questionCounts', {})
+    try:
+        with timed_span(STAGE_SECONDS, "generate"):
+            quiz_text = generation_cache.get_or_compute(
+                quiz_cache_key(data, doc_hash),
+                lambda: generate_quiz_from_text(text, question_counts, courseId, instructions,
+                                                reuse=not _flag(data.get('fresh'))),
+                bypass=_flag(data.get('fresh')),
+                keep=lambda quiz_text: quiz_is_complete(quiz_text, question_counts)
+            )
+    except Exception as e:
+        print(f"Error generating quiz text: {str(e)}")
+        raise QuizPipelineError(f"Error generating quiz text: {str(e)}")
+    require_questions(quiz_text)
+
+    return finish_quiz(data, quiz_text, report)
+
+
+def _run_quiz_job(job, data, pdf_bytes, doc_hash):
+    return run_quiz_pipeline(data, pdf_bytes, doc_hash, job.report)
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _wants_async(data):
+    return _flag(request.args.get("async", data.get("async", False)))
+
+
+# === Uploads ===
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_FIELDS = ("courseId", "fileName", "instructions", "canvasCourseId", "async", "fresh")
+UPLOAD_JSON_FIELDS = ("questionCounts", "materials")
+
+
+# Werkzeug refuses bodies past these sizes while reading them, with or without a Content-Length,
+# so nothing larger is ever buffered. Base64 grows a PDF by a third; the rest is room for form fields.
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES * 4 // 3 + 64 * 1024
+MAX_BATCH_REQUEST_BYTES = MAX_BATCH_UPLOAD_BYTES * 4 // 3 + 64 * 1024
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+
+
+class QuizRequest(Request):
+    """Keeps multipart file parts in memory instead of spooling them to a temp file."""
+
+    @property
+    def max_content_length(self):
+        # Batches carry many PDFs, so their route gets its own, larger limit
+        if self.path.rstrip("/") == "/generate-quiz/batch":
+            return MAX_BATCH_REQUEST_BYTES
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
+app.request_class = QuizRequest
+
+
+def read_upload(stream, limit=MAX_UPLOAD_BYTES):
+    """Read an upload stream into a single buffer, hashing it as it arrives.
+
+    Returns (bytes, sha256 hex digest). Raises a 413 QuizPipelineError once
+    the body grows past limit.
+    """
+    buffer = io.BytesIO()
+    digest = hashlib.sha256()
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if buffer.tell() + len(chunk) > limit:
+            raise QuizPipelineError(f"Upload exceeds the {limit // (1024 * 1024)} MB limit", 413)
+        digest.update(chunk)
+        buffer.write(chunk)
+    return buffer.getvalue(), digest.hexdigest()
+
+
+def _upload_fields(fields):
+    """Request fields sent alongside a binary upload, as form fields or query parameters."""
+    data = {key: fields[key] for key in UPLOAD_FIELDS if key in fields}
+    for key in UPLOAD_JSON_FIELDS:
+        if key in fields:
+            try:
+                data[key] = json.loads(fields[key])
+            except ValueError:
+                raise QuizPipelineError(f"{key} must be valid JSON", 400)
+    return data
+
+
+def _request_json():
+    """The JSON body as a dict, or {} when it is missing or not JSON."""
+    # Without a Content-Length, reading stops quietly at the size limit; reading on past it
+    # makes Werkzeug raise RequestEntityTooLarge instead of us parsing a cut-off body
+    request.get_data(cache=True)
+    request.stream.read(1)
+    data = request.get_json(silent=True)
+    return dict(data) if isinstance(data, dict) else {}
+
+
+def _decode_file_data(file_data):
+    """PDF bytes from the base64 fileData field of a JSON request."""
+    if not file_data:
+        raise QuizPipelineError("No file data provided", 400)
+    try:
+        return base64.b64decode(file_data)
+    except Exception as e:
+        print(f"Error decoding file: {str(e)}")
+        raise QuizPipelineError(f"Error decoding file: {str(e)}", 400)
+
+
+def read_quiz_request():
+    """Parse a /generate-quiz request into (fields, pdf bytes, document hash).
+
+    Accepts the original JSON body with base64 fileData, a multipart form with
+    a "file" part, or a raw application/pdf body with fields in the query string.
+    """
+    try:
+        if request.mimetype == "application/pdf":
+            data = _upload_fields(request.args)
+            pdf_bytes, doc_hash = read_upload(request.stream)
+        elif request.mimetype == "multipart/form-data":
+            upload = request.files.get("file")
+            if upload is None:
+                raise QuizPipelineError("No file data provided", 400)
+            data = _upload_fields(request.form)
+            data.setdefault("fileName", upload.filename)
+            # QuizRequest already buffered the part in memory; take its bytes without copying
+            pdf_bytes = upload.stream.getvalue()
+            doc_hash = document_hash(pdf_bytes)
+        else:
+            data = _request_json()
+            pdf_bytes = _decode_file_data(data.pop('fileData', None))
+            doc_hash = document_hash(pdf_bytes)
+    except RequestEntityTooLarge:
+        raise QuizPipelineError(f"Upload exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit", 413)
+
+    if not pdf_bytes:
+        print("Error: No file data provided")
+        raise QuizPipelineError("No file data provided", 400)
+    if len(pdf_bytes) > MAX_UPLOAD_BYTES:
+        raise QuizPipelineError(f"Upload exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit", 413)
+    UPLOAD_BYTES.observe(len(pdf_bytes))
+    log_event("upload", bytes=len(pdf_bytes), contentType=request.mimetype, document=doc_hash[:12])
+    return data, pdf_bytes, doc_hash
+
+
 # === Modified Main Route: Generate Quiz ===
 @app.route("/generate-quiz", methods=["POST"])
 def generate_quiz():
     try:
-        data = request.json
+        data, pdf_bytes, doc_hash = read_quiz_request()
+        if "fresh" in request.args:
+            data["fresh"] = request.args["fresh"]
         print("Received request data:", {
             'courseId': data.get('courseId'),
             'materials': data.get('materials'),
             'questionCounts': data.get('questionCounts'),
             'fileName': data.get('fileName'),
             'instructions': data.get('instructions', ''),
-            'hasFileData': bool(data.get('fileData')),
-            'fileDataLength': len(data.get('fileData', '')) if data.get('fileData') else 0
+            'contentType': request.mimetype,
+            'uploadBytes': len(pdf_bytes)
         })
-        
-        # Get file data from request
-        file_data = data.get('fileData')
-        file_name = data.get('fileName')
-        instructions = data.get('instructions', '')
-        courseId = data.get('courseId')
-        if not file_data:
-            print("Error: No file data provided")
-            return jsonify({"error": "No file data provided"}), 400
-            
-        # Save the file temporarily
-        temp_file_path = f"temp_{file_name}"
-        try:
-            with open(temp_file_path, 'wb') as f:
-                f.write(base64.b64decode(file_data))
-        except Exception as e:
-            print(f"Error saving file: {str(e)}")
-            return jsonify({"error": f"Error saving file: {str(e)}"}), 500
-            
-        # Extract text from PDF
-        try:
-            reader = PdfReader(temp_file_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text()
-        except Exception as e:
-            print(f"Error reading PDF: {str(e)}")
-            return jsonify({"error": f"Error reading PDF: {str(e)}"}), 500
-            
-        # Clean up temp file
+
+        if _wants_async(data):
+            try:
+                job = job_queue.submit("generate-quiz", bind_context(_run_quiz_job), data, pdf_bytes, doc_hash)
+            except QueueFullError as e:
+                response = jsonify({"error": str(e)})
+                response.headers["Retry-After"] = "30"
+                return response, 503
+            return jsonify({
+                "jobId": job.id,
+                "status": job.status,
+                "statusUrl": f"/jobs/{job.id}"
+            }), 202
+
+        return jsonify(run_quiz_pipeline(data, pdf_bytes, doc_hash))
+
+    except QuizPipelineError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        print("Error in generate_quiz:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+def read_batch_request():
+    """Parse a /generate-quiz/batch request into a list of (fields, pdf bytes, document hash, error).
+
+    Accepts a multipart form with one "files" part per PDF, or a JSON body
+    with an "items" list whose entries carry base64 fileData. Top-level
+    fields apply to every item; an "items" entry overrides them for its own
+    file (with multipart, send "items" as a JSON form field in file order).
+    An item that cannot be read keeps its error instead of failing the batch.
+    """
+    try:
+        shared, entries = _read_batch_entries()
+    except RequestEntityTooLarge:
+        raise QuizPipelineError(f"Batch exceeds the {MAX_BATCH_UPLOAD_BYTES // (1024 * 1024)} MB limit", 413)
+
+    if not entries:
+        raise QuizPipelineError("No files provided", 400)
+    if len(entries) > batch_queue.max_items:
+        raise QuizPipelineError(f"At most {batch_queue.max_items} files per batch", 400)
+
+    items = []
+    for override, pdf_bytes, error in entries:
+        data = dict(shared, **override)
+        data.pop("async", None)
+        if error is None and not pdf_bytes:
+            error = "No file data provided"
+        elif error is None and len(pdf_bytes) > MAX_UPLOAD_BYTES:
+            error = f"Upload exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+        if error is None:
+            UPLOAD_BYTES.observe(len(pdf_bytes))
+        items.append((data, pdf_bytes, document_hash(pdf_bytes) if error is None else None, error))
+    return items
+
+
+def _read_batch_entries():
+    """Shared fields and (overrides, pdf bytes, error) per file of a batch request."""
+    entries = []
+    if request.mimetype == "multipart/form-data":
+        shared = _upload_fields(request.form)
         try:
-            os.remove(temp_file_path)
-        except Exception as e:
-            print(f"Warning: Error removing temp file: {str(e)}")
-        
-        # Generate quiz using the extracted text
+            overrides = json.loads(request.form.get("items") or "[]")
+        except ValueError:
+            raise QuizPipelineError("items must be valid JSON", 400)
+        uploads = request.files.getlist("files") or request.files.getlist("file")
+        for index, upload in enumerate(uploads):
+            override = overrides[index] if index < len(overrides) and isinstance(overrides[index], dict) else {}
+            entries.append((dict(override, fileName=override.get("fileName") or upload.filename),
+                            upload.stream.getvalue(), None))
+    else:
+        shared = _request_json()
+        for item in shared.pop("items", None) or []:
+            item = dict(item) if isinstance(item, dict) else {}
+            try:
+                entries.append((item, _decode_file_data(item.pop("fileData", None)), None))
+            except QuizPipelineError as e:
+                entries.append((item, b"", str(e)))
+    return shared, entries
+
+
+def _run_batch_item(job, data, pdf_bytes, doc_hash, error):
+    if error:
+        raise QuizPipelineError(error, 400)
+    return run_quiz_pipeline(data, pdf_bytes, doc_hash, job.report)
+
+
+@app.route("/generate-quiz/batch", methods=["POST"])
+def generate_quiz_batch():
+    """Queue one quiz per uploaded PDF and answer right away with a batch id.
+
+    Items run on the shared batch workers, paced by the OpenAI and Canvas
+    rate limiters. GET /batches/<batchId> reports each item's own status,
+    result or error.
+    """
+    try:
+        items = read_batch_request()
+        batch = batch_queue.submit("generate-quiz", bind_context(_run_batch_item), [
+            (data.get("fileName") or f"file-{index + 1}", (data, pdf_bytes, doc_hash, error))
+            for index, (data, pdf_bytes, doc_hash, error) in enumerate(items)
+        ])
+    except QuizPipelineError as e:
+        return jsonify({"error": str(e)}), e.status
+    except QueueFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    except Exception as e:
+        print("Error in generate_quiz_batch:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+    log_event("batch", batchId=batch.id, items=len(batch.jobs))
+    return jsonify({
+        "batchId": batch.id,
+        "status": "running",
+        "statusUrl": f"/batches/{batch.id}",
+        "items": [{"index": index, "name": name, "jobId": job.id}
+                  for index, (name, job) in enumerate(zip(batch.names, batch.jobs))]
+    }), 202
+
+
+@app.route("/batches/<batch_id>", methods=["GET"])
+def get_batch(batch_id):
+    batch = batch_queue.get(batch_id)
+    if batch is None:
+        return jsonify({"error": "Batch not found"}), 404
+    return jsonify(batch.to_dict())
+
+
+def _relay_stages(fn, *args):
+    """Run fn(*args, report=...) on a thread, yielding its stage reports as SSE events.
+
+    Returns fn's result to the caller through `yield from`.
+    """
+    events = queue.Queue()
+    outcome = {}
+
+    def report(stage, progress=None):
+        events.put({"stage": stage, "progress": progress})
+
+    def run():
         try:
-            quiz_text = generate_quiz_from_text(text, data.get('questionCounts', {}), instructions, courseId)
+            outcome["result"] = fn(*args, report=report)
         except Exception as e:
-            print(f"Error generating quiz text: {str(e)}")
-            return jsonify({"error": f"Error generating quiz text: {str(e)}"}), 500
+            outcome["error"] = e
+        finally:
+            events.put(None)
+
+    threading.Thread(target=bind_context(run), daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield format_sse("stage", event)
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
 
-        quiz_text = clean_quiz_text(quiz_text)
-        txt_filename = os.path.join(PUBLIC_FOLDER, "output.txt")
-        with open(txt_filename, "w", encoding="utf-8") as file:
-            file.write(quiz_text)
-        qti_url = ""
-        output_zip_path = os.path.join("public", "output.zip")
-        # === Step 4: Convert to QTI using text2qti ===
-        if check_text2qti():
-            try:
-                # Run text2qti without the -o flag
-                subprocess.run(["text2qti", txt_filename], check=True)
-                print("✅ QTI package successfully created.")
 
-                if os.path.exists(output_zip_path):
-                    qti_url = "http://localhost:8080/output.zip"
-                    print(f"✅ QTI ZIP accessible at: {qti_url}")
+@app.route("/generate-quiz/stream", methods=["POST"])
+def generate_quiz_stream():
+    """Server-sent-events variant of /generate-quiz.
+
+    Emits "stage" events as the pipeline progresses, a "question" event for
+    each question as the model finishes it, then "done" with the same payload
+    /generate-quiz returns (or "error").
+    """
+    try:
+        data, pdf_bytes, doc_hash = read_quiz_request()
+        if "fresh" in request.args:
+            data["fresh"] = request.args["fresh"]
+    except QuizPipelineError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    request_id = current_request_id()
+
+    def events():
+        # The body is streamed after the request context is gone; keep logging under its id
+        set_request_id(request_id)
+        try:
+            yield format_sse("stage", {"stage": "extracting", "progress": 5})
+            text = load_document_text(pdf_bytes, doc_hash)
+
+            yield format_sse("stage", {"stage": "generating", "progress": 20})
+            cache_key = quiz_cache_key(data, doc_hash)
+            quiz_text = None if _flag(data.get('fresh')) else generation_cache.peek(cache_key)
+            number = 0
+            with timed_span(STAGE_SECONDS, "generate", stream=True):
+                if quiz_text is not None:
+                    streamer = QuestionStreamer()
+                    for question in streamer.feed(quiz_text) + streamer.close():
+                        number += 1
+                        yield format_sse("question", {"number": number, "text": question})
                 else:
-                    print("⚠️ output.zip not found.")
-                    qti_url = ""
-                canvas_api_url = os.getenv("CANVAS_API_URL", "https://k12.instructure.com")
-                canvas_api_token = os.getenv("CANVAS_API_TOKEN")
-                canvas_course_id = data.get("canvasCourseId")
-                try:
-                    if not canvas_course_id:
-                        raise ValueError("Canvas course ID is missing")
-                    if not canvas_api_token:
-                        raise ValueError("Canvas API token is not set")
-
-                    init_url = f"{canvas_api_url}/api/v1/courses/{canvas_course_id}/content_migrations"
-                    qti_zip_path = os.path.join(PUBLIC_FOLDER, "output.zip")
-                    payload = {
-                        "migration_type": "qti_converter",
-                        "pre_attachment[name]": os.path.basename(qti_zip_path)
-                    }
-                    headers = {"Authorization": f"Bearer {canvas_api_token}"}
-                    response = requests.post(init_url, data=payload, headers=headers)
-                    response.raise_for_status()
-                    migration = response.json()
-                    upload_url = migration.get("pre_attachment", {}).get("upload_url")
-                    upload_params = migration.get("pre_attachment", {}).get("upload_params")
-                    progress_url = migration.get("progress_url")
-                    print("Content migration initiated.")
-
-                    with open(qti_zip_path, "rb") as f:
-                        files = {"file": f}
-                        upload_response = requests.post(upload_url, data=upload_params, files=files)
-                        if upload_response.status_code in (301, 302):
-                            confirm_url = upload_response.headers.get("Location")
-                            if confirm_url:
-                                confirm_response = requests.get(confirm_url, headers=headers)
-                                confirm_response.raise_for_status()
-                                print("File upload confirmed.")
+                    for kind, value in stream_quiz_from_text(text, data.get('questionCounts', {}),
+                                                             data.get('courseId'), data.get('instructions', ''),
+                                                             reuse=not _flag(data.get('fresh'))):
+                        if kind == "question":
+                            number += 1
+                            yield format_sse("question", {"number": number, "text": value})
                         else:
-                            upload_response.raise_for_status()
-                            print("File uploaded successfully.")
-
-                    print("Processing QTI file...")
-                    start_time = time.time()
-                    max_poll_duration = 30
-                    while time.time() - start_time < max_poll_duration:
-                        prog_resp = requests.get(progress_url, headers=headers)
-                        prog_resp.raise_for_status()
-                        progress_data = prog_resp.json()
-                        state = progress_data.get("workflow_state")
-                        completion = progress_data.get("completion", 0)
-                        print(f"Progress: {completion}% (state: {state})")
-                        if state == "completed":
-                            print("Import completed! Quiz has been created in Canvas.")
-                            break
-                        elif state == "failed":
-                            raise Exception("Import failed: " + str(progress_data))
-                        time.sleep(2)
-                    else:
-                        print(
-                            f"Preview returned; file upload is still processing. Last recorded progress: {completion}%.")
-                except Exception as e:
-                    print(f"⚠️ Warning: Skipping Canvas upload. Reason: {e}")
-
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Error running text2qti: {e}")
-                qti_zip = None
-        else:
-            print("⚠️  text2qti not installed or not in PATH. Run 'pip install text2qti'.")
-            qti_zip = None
+                            quiz_text = value
+                    if quiz_is_complete(quiz_text, data.get('questionCounts', {})):
+                        generation_cache.put(cache_key, quiz_text)
+            require_questions(quiz_text)
 
-        # Generate unique quiz ID
-        quiz_id = str(uuid.uuid4())
-        
-        # Return quiz data directly without storing in Firestore
-        return jsonify({
-            'quizId': quiz_id,
-            'quizText': quiz_text,
-            'courseId': data.get('courseId'),
-            'materials': data.get('materials', []),
-            'questionCounts': data.get('questionCounts', {}),
-            'instructions': data.get('instructions', ''),
-            'createdAt': datetime.now().isoformat(),
-            'qtiUrl': qti_url,
-            'fileName': file_name
-        })
-        
-    except Exception as e:
-        print("Error in generate_quiz:", str(e))
-        return jsonify({"error": str(e)}), 500
+            payload = yield from _relay_stages(finish_quiz, data, quiz_text)
+            yield format_sse("done", payload)
+        except Exception as e:
+            print("Error in generate_quiz_stream:", str(e))
+            yield format_sse("error", {"error": str(e)})
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# === Request Ids and Metrics ===
+@app.before_request
+def start_request_timer():
+    # Honour an id set by a proxy so its logs and ours can be joined
+    request_id = request.headers.get("X-Request-ID", "")[:64] or new_request_id()
+    g.request_id_token = set_request_id(request_id)
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    seconds = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint, method=request.method, status=response.status_code)
+    log_event("request", method=request.method, endpoint=endpoint, status=response.status_code,
+              durationMs=round(seconds * 1000, 2))
+    response.headers["X-Request-ID"] = current_request_id()
+    return response
+
+
+@app.teardown_request
+def clear_request_id(error=None):
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        reset_request_id(token)
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify({
+        "pdfText": pdf_text_cache.stats(),
+        "generation": generation_cache.stats(),
+        "quizzes": quiz_store.stats(),
+        "questionBank": question_bank.stats() if question_bank is not None else None
+    })
+
+
+@app.route("/http-stats", methods=["GET"])
+def http_stats():
+    return jsonify(client_stats())
+
+
+@app.route("/migrations/<migration_id>", methods=["GET"])
+def get_migration(migration_id):
+    migration = migration_poller.get(migration_id)
+    if migration is None:
+        return jsonify({"error": "Migration not found"}), 404
+    return jsonify(migration.to_dict())
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/api/get-quiz-text/<quiz_id>', methods=['GET'])
 def get_quiz_text(quiz_id):
     try:
-        # Get quiz data from Firestore
-        quiz_doc = db.collection('quizzes').document(quiz_id).get()
-        if not quiz_doc.exists:
+        # Get quiz data from Firestore (through the cache)
+        quiz_data = quiz_store.get(quiz_id)
+        if quiz_data is None:
             return jsonify({"error": "Quiz not found"}), 404
             
-        quiz_data = quiz_doc.to_dict()
-        return quiz_data.get('quizText', '')
+        return stored_quiz_text(quiz_data, 'quizText')
         
     except Exception as e:
         print("Error getting quiz text:", str(e))
         return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/quizzes/batch', methods=['POST'])
+def get_quiz_texts():
+    """Quiz texts for many ids, fetched from Firestore in one round trip."""
+    try:
+        quiz_ids = (request.get_json(silent=True) or {}).get('ids')
+        if not isinstance(quiz_ids, list) or not all(isinstance(quiz_id, str) and quiz_id for quiz_id in quiz_ids):
+            return jsonify({"error": "ids must be a list of quiz IDs"}), 400
+        if len(quiz_ids) > MAX_BATCH_QUIZ_IDS:
+            return jsonify({"error": f"At most {MAX_BATCH_QUIZ_IDS} ids per request"}), 400
+
+        quizzes = quiz_store.get_many(quiz_ids)
+        return jsonify({
+            "quizzes": {quiz_id: {"text": stored_quiz_text(data)} for quiz_id, data in quizzes.items() if data is not None},
+            "missing": [quiz_id for quiz_id, data in quizzes.items() if data is None]
+        })
+
+    except Exception as e:
+        print("Error getting quiz texts:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/quizzes/<quiz_id>/qti.zip')
+def download_quiz_qti(quiz_id):
+    try:
+        qti_zip = artifact_store.get(quiz_id, "qti.zip")
+    except ValueError:
+        qti_zip = None
+    if qti_zip is None:
+        return jsonify({"error": "QTI package not found"}), 404
+    return send_file(io.BytesIO(qti_zip), mimetype="application/zip",
+                     as_attachment=True, download_name=f"quiz-{quiz_id}.zip")
+
+
 @app.route('/output.zip')
 def download_qti():
-    return send_from_directory('public', 'output.zip', as_attachment=True)
+    """Retired link to the newest package of any user; each quiz has its own URL now."""
+    return jsonify({"error": "/output.zip is no longer served; download /quizzes/<quizId>/qti.zip, "
+                             "the qtiUrl returned with the quiz"}), 410
 
 
 
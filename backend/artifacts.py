@@ -0,0 +1,124 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+ARTIFACT_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+ARTIFACT_NAME = re.compile(r'^[A-Za-z0-9_-]+(\.[A-Za-z0-9]+)?$')
+
+
+class ArtifactStore:
+    """Files produced for each quiz, stored under root_dir/<quiz id>/<name>.
+
+    Every quiz gets its own directory, so concurrent requests never overwrite
+    each other, and because the files live on disk every worker process can
+    serve them. Recently written artifacts are also kept in a small in-memory
+    LRU. Quizzes older than max_age seconds are evicted, then the oldest ones
+    until the store fits in max_bytes.
+    """
+
+    def __init__(self, root_dir, max_bytes=512 * 1024 * 1024, max_age=24 * 3600,
+                 memory_bytes=32 * 1024 * 1024, evict_interval=60):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory_bytes = memory_bytes
+        self.evict_interval = evict_interval
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._last_evict = 0
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def put(self, artifact_id, name, data):
+        path = self._path(artifact_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so a concurrent download never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._remember(path, data)
+        self._maybe_evict()
+        return path
+
+    def get(self, artifact_id, name):
+        """Artifact bytes, or None when it does not exist or has expired."""
+        path = self._path(artifact_id, name)
+        with self._lock:
+            entry = self._memory.get(path)
+            if entry is not None:
+                if entry[1] + self.max_age > time.time():
+                    self._memory.move_to_end(path)
+                    return entry[0]
+                self._forget(path)
+        try:
+            if os.path.getmtime(path) + self.max_age <= time.time():
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def evict(self):
+        """Drop expired quizzes, then the oldest ones until the store fits its byte budget."""
+        entries = []
+        total = 0
+        cutoff = time.time() - self.max_age
+        for artifact_id in os.listdir(self.root_dir):
+            folder = os.path.join(self.root_dir, artifact_id)
+            try:
+                mtime = os.path.getmtime(folder)
+                size = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+            except OSError:
+                continue
+            if mtime < cutoff:
+                self._remove(folder)
+                continue
+            entries.append((mtime, size, folder))
+            total += size
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, folder = entries.pop(0)
+            self._remove(folder)
+            total -= size
+
+    def _maybe_evict(self):
+        with self._lock:
+            if time.time() - self._last_evict < self.evict_interval:
+                return
+            self._last_evict = time.time()
+        try:
+            self.evict()
+        except OSError as e:
+            print(f"⚠️ Warning: Artifact eviction failed: {e}")
+
+    def _remove(self, folder):
+        shutil.rmtree(folder, ignore_errors=True)
+        with self._lock:
+            for path in [p for p in self._memory if p.startswith(folder + os.sep)]:
+                self._forget(path)
+
+    def _path(self, artifact_id, name):
+        if not ARTIFACT_ID.match(artifact_id or "") or not ARTIFACT_NAME.match(name or ""):
+            raise ValueError(f"Invalid artifact path: {artifact_id}/{name}")
+        return os.path.join(self.root_dir, artifact_id, name)
+
+    def _remember(self, path, data):
+        if len(data) > self.memory_bytes:
+            return
+        self._forget(path)
+        self._memory[path] = (data, time.time())
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _forget(self, path):
+        entry = self._memory.pop(path, None)
+        if entry is not None:
+            self._memory_size -= len(entry[0])
@@ -0,0 +1,63 @@
+"""Synthetic lecture PDFs for benchmarking, written without any PDF library."""
+import random
+
+WORDS = (
+    "algorithm analysis assignment bandwidth campus collaboration community compatibility "
+    "computer course data device documentation evaluation feasibility hardware internet "
+    "laboratory lecture memory network operating presentation processor project protocol "
+    "research rural software storage student system technology university urban video"
+).split()
+
+PAGE_SIZES = (1, 10, 50, 100, 300, 500)
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng, lines_per_page):
+    for _ in range(lines_per_page):
+        yield " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))).capitalize() + "."
+
+
+def make_pdf(pages, seed=0, lines_per_page=40):
+    """Bytes of a valid PDF with `pages` pages of deterministic pseudo-lecture text."""
+    rng = random.Random(seed * 100003 + pages)
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for _ in range(pages):
+        text = "".join(f"({_escape(line)}) '\n" for line in _page_lines(rng, lines_per_page))
+        stream = f"BT /F1 10 Tf 14 TL 54 760 Td\n{text}ET".encode("latin-1")
+        contents = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (page_tree, font, contents)))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def corpus(page_sizes=PAGE_SIZES, copies=1):
+    """[(name, pdf bytes)] covering each page size; copies get different text."""
+    return [(f"lecture-{pages}p-{copy}.pdf", make_pdf(pages, seed=copy))
+            for pages in page_sizes for copy in range(copies)]
@@ -0,0 +1,237 @@
+"""Local stand-ins for OpenAI, Canvas and Firestore so the backend can be benchmarked offline."""
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUESTION_COUNT = re.compile(r'(\d+) ([^,.]+?) questions')
+
+
+def fake_quiz(prompt):
+    """Quiz text in the sample format with the question counts the prompt asks for."""
+    blocks = []
+    for count, q_type in QUESTION_COUNT.findall(prompt.split("Text to generate quiz from:")[0]):
+        for _ in range(int(count)):
+            n = len(blocks) + 1
+            kind = q_type.lower()
+            if "true" in kind:
+                blocks.append(f"{n}. Statement {n} about the lecture is correct.\n*a) True\nb) False")
+            elif "select" in kind or "all" in kind:
+                blocks.append(f"{n}. Which of these apply to topic {n}? (Select all that apply)\n"
+                              f"[*] Option one\n[*] Option two\n[] Option three\n[] Option four")
+            else:
+                blocks.append(f"{n}. What is described in section {n}?\n"
+                              f"a) First answer\n*b) Second answer\nc) Third answer\nd) Fourth answer")
+    return "\n\n".join(blocks)
+
+
+class _Server:
+    handler = None
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        fake = self.server.fake
+        request = json.loads(self._body() or b"{}")
+        prompt = request["messages"][-1]["content"]
+        content = fake_quiz(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with fake.lock:
+            fake.calls += 1
+        time.sleep(fake.latency)
+        if not request.get("stream"):
+            time.sleep(fake.per_token_latency * usage["completion_tokens"])
+            self._json(200, {
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+        for piece in pieces:
+            time.sleep(fake.per_token_latency * 4)
+            self._chunk({
+                "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            })
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, payload):
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class FakeOpenAI(_Server):
+    """Chat completions endpoint (plain and streaming) with configurable latency."""
+
+    handler = _OpenAIHandler
+
+    def __init__(self, latency=0.5, per_token_latency=0.0005):
+        super().__init__()
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v1"
+
+
+class _CanvasHandler(_Handler):
+    def do_POST(self):
+        fake = self.server.fake
+        self._body()
+        time.sleep(fake.latency)
+        if self.path.endswith("/content_migrations"):
+            migration_id = next(fake.ids)
+            with fake.lock:
+                fake.progress[migration_id] = 0
+            self._json(200, {
+                "id": migration_id,
+                "progress_url": f"{fake.url}/api/v1/progress/{migration_id}",
+                "pre_attachment": {"upload_url": f"{fake.url}/upload/{migration_id}",
+                                   "upload_params": {"key": f"upload-{migration_id}"}},
+            })
+        elif self.path.startswith("/upload/"):
+            self._json(201, {"id": int(self.path.rsplit("/", 1)[1])})
+        else:
+            self._json(404, {"errors": [{"message": "not found"}]})
+
+    def do_GET(self):
+        fake = self.server.fake
+        time.sleep(fake.latency)
+        if not self.path.startswith("/api/v1/progress/"):
+            self._json(404, {"errors": [{"message": "not found"}]})
+            return
+        migration_id = int(self.path.rsplit("/", 1)[1])
+        with fake.lock:
+            fake.polls += 1
+            completion = min(100, fake.progress.get(migration_id, 0) + fake.step)
+            fake.progress[migration_id] = completion
+        state = "completed" if completion >= 100 else "running"
+        self._json(200, {"workflow_state": state, "completion": completion})
+
+
+class FakeCanvas(_Server):
+    """Content-migration, file-upload and progress endpoints of the Canvas API."""
+
+    handler = _CanvasHandler
+
+    def __init__(self, latency=0.05, step=34):
+        super().__init__()
+        self.latency = latency
+        self.step = step
+        self.ids = itertools.count(1)
+        self.progress = {}
+        self.polls = 0
+        self.lock = threading.Lock()
+
+
+class _FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self._key = (collection, doc_id)
+        self.id = doc_id
+
+    def get(self):
+        time.sleep(self._db.latency)
+        with self._db.lock:
+            self._db.reads += 1
+            return _FakeSnapshot(self.id, self._db.docs.get(self._key))
+
+    def set(self, data):
+        time.sleep(self._db.latency)
+        with self._db.lock:
+            self._db.docs[self._key] = dict(data)
+
+
+class _FakeCollection:
+    def __init__(self, db, name):
+        self._db = db
+        self._name = name
+
+    def document(self, doc_id):
+        return _FakeDocument(self._db, self._name, doc_id)
+
+
+class FakeFirestore:
+    """In-process stand-in for the parts of the Firestore client the backend uses."""
+
+    def __init__(self, latency=0.01):
+        self.latency = latency
+        self.docs = {}
+        self.reads = 0
+        self.lock = threading.Lock()
+
+    def collection(self, name):
+        return _FakeCollection(self, name)
+
+    def get_all(self, refs):
+        refs = list(refs)
+        time.sleep(self.latency)
+        with self.lock:
+            self.reads += 1
+            return [_FakeSnapshot(ref.id, self.docs.get(ref._key)) for ref in refs]
@@ -0,0 +1,85 @@
+"""Cold-start benchmark for the backend.
+
+Each run starts a fresh interpreter, times `import aitoken`, and then times
+the first use of everything that is now initialized lazily: the Firestore
+client, the OpenAI and Canvas clients and PyPDF2. Before lazy
+initialization, all of that was paid at import, so "import + first use"
+is what booting a worker used to cost. Run it from the backend folder:
+
+    python -m bench.import_time --runs 5
+
+The first-use phase creates the Firestore client from firebase-adminsdk.json
+but never sends a request; pass --skip-firebase when that file is not present.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("firebase_admin", "google.cloud.firestore", "openai", "httpx", "requests", "PyPDF2", "numpy")
+
+PROBE = r"""
+import contextlib, json, sys, time
+with contextlib.redirect_stdout(sys.stderr):
+    start = time.perf_counter()
+    import aitoken
+    imported = time.perf_counter()
+    loaded_at_import = [name for name in HEAVY if name in sys.modules]
+    modules_at_import = len(sys.modules)
+
+    from bench.corpus import make_pdf
+    if not SKIP_FIREBASE:
+        aitoken.get_db()
+    aitoken.get_openai_client(aitoken.openai_api_key)
+    aitoken.get_canvas_session()
+    aitoken.extract_pdf_text(make_pdf(1, seed=0))
+    aitoken.load_sample_quiz()
+    first_use = time.perf_counter()
+print(json.dumps({
+    "importSeconds": imported - start,
+    "firstUseSeconds": first_use - imported,
+    "modulesAtImport": modules_at_import,
+    "modulesAfterFirstUse": len(sys.modules),
+    "heavyLoadedAtImport": loaded_at_import,
+}))
+"""
+
+
+def run_probe(skip_firebase):
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = f"HEAVY = {HEAVY_MODULES!r}\nSKIP_FIREBASE = {skip_firebase!r}\n{PROBE}"
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "bench")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=backend_dir, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"probe exited with {result.returncode}")
+    return json.loads(result.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--skip-firebase", action="store_true", help="do not create the Firestore client")
+    args = parser.parse_args(argv)
+
+    try:
+        samples = [run_probe(args.skip_firebase) for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(f"❌ Probe failed:\n{e}", file=sys.stderr)
+        return 1
+
+    import_s = statistics.median(s["importSeconds"] for s in samples)
+    first_use_s = statistics.median(s["firstUseSeconds"] for s in samples)
+    print(f"import aitoken            {import_s * 1000:8.1f} ms  ({samples[0]['modulesAtImport']} modules)")
+    print(f"first use of lazy clients {first_use_s * 1000:8.1f} ms  ({samples[0]['modulesAfterFirstUse']} modules)")
+    print(f"import + first use        {(import_s + first_use_s) * 1000:8.1f} ms  (boot cost with eager init)")
+    print(f"saved at boot             {first_use_s / (import_s + first_use_s):8.0%}")
+    heavy = samples[0]["heavyLoadedAtImport"]
+    print(f"heavy modules loaded by import: {', '.join(heavy) if heavy else 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""Offline benchmark for /generate-quiz.
+
+Runs the real Flask app against local stand-ins for OpenAI, Canvas and
+Firestore and reports per-stage latency percentiles, throughput and peak
+RSS at each concurrency level. Run it from the backend folder:
+
+    python -m bench.run_bench --concurrency 1 4 16 --pages 1 10 100 500
+
+Every concurrency level runs in its own process so peak RSS is per level.
+Use --save to record a baseline and --compare to fail (exit code 1) when a
+later run's p95 latencies regress past --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bench.corpus import PAGE_SIZES, corpus
+from bench.fakes import FakeCanvas, FakeFirestore, FakeOpenAI
+
+STAGES = {
+    "extract": "load_document_text",
+    "generate": "generate_quiz_from_text",
+    "package": "convert_to_qti",
+    "canvas_upload": "upload_qti_to_canvas",
+}
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "p50": rank(50),
+        "p90": rank(90),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": ordered[-1],
+    }
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+
+def run_level(args, concurrency):
+    """Benchmark one concurrency level inside this process; returns its report."""
+    with FakeOpenAI(latency=args.openai_latency) as openai_server, \
+            FakeCanvas(latency=args.canvas_latency) as canvas_server:
+        os.environ.update({
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": openai_server.base_url,
+            "CANVAS_API_URL": canvas_server.url,
+            "CANVAS_API_TOKEN": "bench",
+            "ARTIFACT_DIR": tempfile.mkdtemp(prefix="quiz-bench-"),
+            "QUIZ_WORKERS": str(concurrency),
+            # The stand-in quizzes repeat themselves, so the bank would reject them as duplicates
+            "QUESTION_BANK_DIR": "",
+        })
+        if not args.cache:
+            os.environ["PDF_CACHE_MAX_MB"] = "0"
+            os.environ.pop("PDF_CACHE_DIR", None)
+
+        import aitoken
+        fake_db = FakeFirestore(latency=args.firestore_latency)
+        aitoken.get_db = lambda: fake_db
+        timer = StageTimer()
+        for stage, name in STAGES.items():
+            setattr(aitoken, name, timer.wrap(stage, getattr(aitoken, name)))
+
+        documents = corpus(args.pages)
+        endpoint = "/generate-quiz/stream" if args.stream else "/generate-quiz"
+        client = aitoken.app.test_client()
+        counts = json.dumps({"multiple choice": args.questions, "true/false": max(1, args.questions // 3)})
+        latencies = []
+        first_question = []
+        migration_ids = []
+        errors = []
+        lock = threading.Lock()
+
+        def send(i):
+            name, pdf = documents[i % len(documents)]
+            form = {
+                "file": (io.BytesIO(pdf), name),
+                "courseId": "BENCH101",
+                "canvasCourseId": "1",
+                "questionCounts": counts,
+                "fresh": "0" if args.cache else "1",
+            }
+            start = time.perf_counter()
+            response = client.post(endpoint, data=form, content_type="multipart/form-data", buffered=not args.stream)
+            if args.stream:
+                payload = None
+                seen_question = False
+                for event in response.response:
+                    event = event.decode("utf-8") if isinstance(event, bytes) else event
+                    if event.startswith("event: question") and not seen_question:
+                        seen_question = True
+                        with lock:
+                            first_question.append(time.perf_counter() - start)
+                    elif event.startswith("event: done"):
+                        payload = json.loads(event.split("data: ", 1)[1])
+                    elif event.startswith("event: error"):
+                        break
+                ok = payload is not None
+            else:
+                payload = response.get_json(silent=True)
+                ok = response.status_code == 200
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors.append(f"{name}: {response.status_code}")
+                elif payload.get("canvasMigration"):
+                    migration_ids.append(payload["canvasMigration"]["migrationId"])
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(send, range(args.requests)))
+        wall = time.perf_counter() - wall_start
+
+        for migration_id in migration_ids:
+            status = aitoken.migration_poller.wait(migration_id, timeout=60)
+            if status is not None and status.finished_at:
+                created = datetime.fromisoformat(status.created_at).timestamp()
+                timer.record("canvas_import", status.finished_at - created)
+
+        report = {
+            "concurrency": concurrency,
+            "requests": args.requests,
+            "errors": errors,
+            "wallSeconds": wall,
+            "throughputRps": args.requests / wall if wall else 0.0,
+            "latency": percentiles(latencies),
+            "stages": {stage: percentiles(samples) for stage, samples in timer.samples.items()},
+            "peakRssMb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "openaiCalls": openai_server.calls,
+            "canvasPolls": canvas_server.polls,
+        }
+        if first_question:
+            report["timeToFirstQuestion"] = percentiles(first_question)
+        return report
+
+
+def print_report(reports):
+    print(f"{'conc':>4} {'req/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'rss MB':>7} {'errors':>6}")
+    for r in reports:
+        lat = r["latency"]
+        print(f"{r['concurrency']:>4} {r['throughputRps']:>7.2f} {lat.get('p50', 0):>7.3f} "
+              f"{lat.get('p95', 0):>7.3f} {lat.get('p99', 0):>7.3f} {r['peakRssMb']:>7.1f} {len(r['errors']):>6}")
+        for stage, stats in sorted(r["stages"].items()):
+            print(f"       {stage:<14} p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s  n={stats['count']}")
+        if "timeToFirstQuestion" in r:
+            print(f"       {'first question':<14} p50 {r['timeToFirstQuestion']['p50']:.3f}s")
+
+
+def compare(reports, baseline, tolerance):
+    """Regression messages for p95 latencies that grew more than tolerance over the baseline."""
+    previous = {r["concurrency"]: r for r in baseline}
+    regressions = []
+    for r in reports:
+        old = previous.get(r["concurrency"])
+        if old is None:
+            continue
+        pairs = [("total", r["latency"], old["latency"])]
+        pairs += [(stage, stats, old["stages"].get(stage, {})) for stage, stats in r["stages"].items()]
+        for name, new_stats, old_stats in pairs:
+            if old_stats.get("p95") and new_stats.get("p95", 0) > old_stats["p95"] * (1 + tolerance):
+                regressions.append(f"concurrency {r['concurrency']} {name}: p95 "
+                                   f"{old_stats['p95']:.3f}s -> {new_stats['p95']:.3f}s")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--pages", type=int, nargs="+", default=list(PAGE_SIZES),
+                        help="page counts of the synthetic PDFs (1-500)")
+    parser.add_argument("--requests", type=int, default=24, help="requests per concurrency level")
+    parser.add_argument("--questions", type=int, default=6, help="multiple choice questions per quiz")
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="seconds before the fake model answers")
+    parser.add_argument("--canvas-latency", type=float, default=0.02)
+    parser.add_argument("--firestore-latency", type=float, default=0.01)
+    parser.add_argument("--stream", action="store_true", help="benchmark /generate-quiz/stream instead")
+    parser.add_argument("--cache", action="store_true", help="leave the text and generation caches on")
+    parser.add_argument("--save", help="write the reports to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth over the baseline")
+    parser.add_argument("--worker-level", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.worker_level:
+        # The backend logs to stdout; keep it free for the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            report = run_level(args, args.worker_level)
+        print(json.dumps(report))
+        return 0
+
+    worker_argv = list(argv if argv is not None else sys.argv[1:])
+    reports = []
+    for level in args.concurrency:
+        result = subprocess.run(
+            [sys.executable, "-m", "bench.run_bench", *worker_argv, "--worker-level", str(level)],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        if result.returncode != 0:
+            print(result.stdout, result.stderr, file=sys.stderr)
+            return result.returncode
+        reports.append(json.loads(result.stdout))
+
+    print_report(reports)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(reports, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            return 1
+    failed = sum(len(r["errors"]) for r in reports)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
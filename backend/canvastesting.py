@@ -1,7 +1,7 @@
-import requests
-import time
 import os
 from dotenv import load_dotenv
+from http_clients import get_canvas_session
+from migration_poller import MigrationPoller
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,6 +19,8 @@ QTI_ZIP_PATH = "./public/output.zip" # Adjust the filename as needed
 headers = {
     "Authorization": f"Bearer {API_TOKEN}"
 }
+# Every call below reuses the pooled keep-alive session instead of opening a new connection.
+canvas = get_canvas_session()
 
 # 2. Initiate content migration for QTI import.
 #    We use the Content Migrations API with migration_type "qti_converter".
@@ -29,7 +31,7 @@ payload = {
     "migration_type": "qti_converter",          # specify QTI import type
     "pre_attachment[name]": QTI_ZIP_PATH.split('/')[-1]  # filename of the QTI zip
 }
-response = requests.post(init_url, data=payload, headers=headers)
+response = canvas.post(init_url, data=payload, headers=headers)
 response.raise_for_status()  # ensure the request was successful
 
 # Parse the JSON response to get upload URL and parameters.
@@ -48,12 +50,12 @@ files = {
     'file': open(QTI_ZIP_PATH, 'rb')
 }
 # Important: Do NOT include the Authorization header in this request.
-upload_response = requests.post(upload_url, data=upload_params, files=files)
+upload_response = canvas.post(upload_url, data=upload_params, files=files)
 if upload_response.status_code in (301, 302):
     # Follow the redirect to finalize the file upload in Canvas.
     confirm_url = upload_response.headers.get('Location')
     if confirm_url:
-        confirm_response = requests.get(confirm_url, headers=headers)
+        confirm_response = canvas.get(confirm_url, headers=headers)
         confirm_response.raise_for_status()
         print("File upload confirmed.")
 else:
@@ -67,27 +69,20 @@ if progress_url.startswith('http'):
     progress_check_url = progress_url
 else:
     progress_check_url = f"{API_URL}{progress_url}"
-while True:
-    prog_resp = requests.get(progress_check_url, headers=headers)
-    prog_resp.raise_for_status()
-    progress_data = prog_resp.json()
-    state = progress_data.get("workflow_state")
-    if state == "completed":
-        print("Import completed! Quiz has been created.")
-        break
-    elif state == "failed":
-        raise Exception(f"Import failed: {progress_data}")
-    # If not completed or failed, you can check progress percentage.
-    percent = progress_data.get("completion")
-    print(f"Progress: {percent}% (state: {state})")
-    time.sleep(2)  # wait before polling again
+# The poller backs off while the import makes no progress instead of polling every 2 seconds.
+poller = MigrationPoller(get_canvas_session, timeout=float("inf"))
+migration = poller.track(progress_check_url, headers)
+poller.wait(migration.id)
+if migration.state != "completed":
+    raise Exception(migration.error)
+print("Import completed! Quiz has been created.")
 # [Content Migrations Progress](https://canvas.instructure.com/doc/api/content_migrations.html#method.content_migrations.show)
 
 # 5. (Optional) Verify the quiz creation via Canvas API.
 #    We can fetch the list of quizzes in the course and find the newest one.
 #    [Quizzes API](https://canvas.instructure.com/doc/api/quizzes.html)
 quizzes_url = f"{API_URL}/api/v1/courses/{COURSE_ID}/quizzes"
-quizzes_resp = requests.get(quizzes_url, headers=headers)
+quizzes_resp = canvas.get(quizzes_url, headers=headers)
 quizzes_resp.raise_for_status()
 quizzes = quizzes_resp.json()
 
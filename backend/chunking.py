@@ -0,0 +1,133 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    # tiktoken is optional; four characters per token is close enough for budgeting
+    _encoding = None
+
+QUESTION_LINE = re.compile(r'^\d+[.)]\s*')
+
+
+def estimate_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _split_oversized(paragraph, max_tokens):
+    """Cut a paragraph that alone exceeds the budget into pieces on whitespace."""
+    max_chars = max(1, len(paragraph) * max_tokens // max(1, estimate_tokens(paragraph)))
+    pieces = []
+    while len(paragraph) > max_chars:
+        cut = paragraph.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(paragraph[:cut])
+        paragraph = paragraph[cut:].lstrip()
+    if paragraph:
+        pieces.append(paragraph)
+    return pieces
+
+
+def split_text(text, max_tokens):
+    """Split text into chunks of at most max_tokens, breaking on paragraph boundaries."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        pieces = [(paragraph, tokens)] if tokens <= max_tokens else [
+            (piece, estimate_tokens(piece)) for piece in _split_oversized(paragraph, max_tokens)]
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def allocate_questions(question_counts, weights):
+    """Share each question type's count between chunks in proportion to their weights.
+
+    Uses largest remainders so every type's total is preserved exactly.
+    Returns one {type: count} dict per chunk.
+    """
+    total_weight = sum(weights) or 1
+    allocations = [{} for _ in weights]
+    for q_type, count in question_counts.items():
+        count = int(count or 0)
+        if count <= 0:
+            continue
+        shares = [count * weight / total_weight for weight in weights]
+        floors = [int(share) for share in shares]
+        leftover = count - sum(floors)
+        by_remainder = sorted(range(len(weights)), key=lambda i: shares[i] - floors[i], reverse=True)
+        for i in by_remainder[:leftover]:
+            floors[i] += 1
+        for allocation, n in zip(allocations, floors):
+            if n:
+                allocation[q_type] = n
+    return allocations
+
+
+def merge_quizzes(quiz_texts):
+    """Join cleaned quiz texts into one quiz, renumbering the questions from 1."""
+    lines = []
+    number = 0
+    for quiz_text in quiz_texts:
+        for line in quiz_text.strip().splitlines():
+            if QUESTION_LINE.match(line):
+                number += 1
+                if lines and lines[-1] != "":
+                    lines.append("")
+                line = QUESTION_LINE.sub(f"{number}. ", line, count=1)
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def chunk_work(text, question_counts, max_chunk_tokens):
+    """The (chunk, counts) prompts needed for question_counts questions about text, in document order.
+
+    Text that fits one prompt is sent whole. Without any positive counts there
+    is nothing to share out, so only the first chunk is sent with the counts
+    unchanged and the model picks how many questions to write, as it does for
+    short text. Never returns an empty list.
+    """
+    chunks = split_text(text, max_chunk_tokens)
+    if len(chunks) <= 1:
+        return [(text, question_counts)]
+    if not any(int(count or 0) > 0 for count in (question_counts or {}).values()):
+        print(f"No question counts given; generating quiz from the first of {len(chunks)} chunks")
+        return [(chunks[0], question_counts)]
+
+    allocations = allocate_questions(question_counts, [estimate_tokens(chunk) for chunk in chunks])
+    work = [(chunk, counts) for chunk, counts in zip(chunks, allocations) if counts]
+    print(f"Generating quiz from {len(work)} of {len(chunks)} chunks")
+    return work
+
+
+def generate_in_chunks(text, question_counts, generate_chunk, max_chunk_tokens=12000, concurrency=4):
+    """Generate a quiz from text too long for one prompt.
+
+    The text is split into chunks of at most max_chunk_tokens, the requested
+    questions are shared out by chunk size, and generate_chunk(chunk, counts)
+    runs for each chunk with at most `concurrency` calls in flight. The
+    results come back merged in document order and renumbered.
+    """
+    work = chunk_work(text, question_counts, max_chunk_tokens)
+    if len(work) == 1:
+        return generate_chunk(*work[0])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(work)))) as executor:
+        results = list(executor.map(lambda item: generate_chunk(*item), work))
+    return merge_quizzes(results)
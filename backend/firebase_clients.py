@@ -0,0 +1,53 @@
+import threading
+
+FIREBASE_CREDENTIALS = "firebase-adminsdk.json"
+FIREBASE_STORAGE_BUCKET = "canvas-ai-2f5b6.appspot.com"
+
+_lock = threading.Lock()
+_app = None
+_db = None
+_bucket = None
+
+
+def get_firebase_app():
+    """The Firebase Admin app, initialized on first use.
+
+    firebase_admin and the Google Cloud client libraries are imported here
+    rather than at module load, so processes that never touch Firebase do
+    not pay for them.
+    """
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                import firebase_admin
+                from firebase_admin import credentials
+                _app = firebase_admin.initialize_app(
+                    credentials.Certificate(FIREBASE_CREDENTIALS),
+                    {'storageBucket': FIREBASE_STORAGE_BUCKET}
+                )
+    return _app
+
+
+def get_db():
+    """Process-wide Firestore client, created on first use."""
+    global _db
+    if _db is None:
+        app = get_firebase_app()
+        with _lock:
+            if _db is None:
+                from firebase_admin import firestore
+                _db = firestore.client(app)
+    return _db
+
+
+def get_bucket():
+    """Default Cloud Storage bucket of the Firebase project, created on first use."""
+    global _bucket
+    if _bucket is None:
+        app = get_firebase_app()
+        with _lock:
+            if _bucket is None:
+                from firebase_admin import storage
+                _bucket = storage.bucket(app=app)
+    return _bucket
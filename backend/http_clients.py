@@ -0,0 +1,187 @@
+import os
+import threading
+
+from rate_limits import RateLimiter
+
+# === Pool Settings ===
+# OPENAI_POOL_SIZE, OPENAI_TIMEOUT_SECONDS, OPENAI_MAX_RETRIES, CANVAS_POOL_SIZE,
+# CANVAS_TIMEOUT_SECONDS and CANVAS_MAX_RETRIES are read when each client is built,
+# not at import, so values that load_dotenv() sets after this module is imported apply.
+# The same goes for CANVAS_REQUESTS_PER_MINUTE and CANVAS_MIN_QUOTA (see get_canvas_rate_limiter).
+CANVAS_BACKOFF_SECONDS = 1.0
+
+_lock = threading.Lock()
+_openai_client = None
+_canvas_session = None
+_canvas_rate_limiter = None
+_canvas_min_quota = None
+_stats_lock = threading.Lock()
+_stats = {
+    "openaiRequests": 0,
+    "openaiConnections": 0,
+    "openaiRetries": 0,
+    "canvasRetries": 0,
+}
+
+
+def _setting(name, default, kind=int):
+    return kind(os.getenv(name, default))
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _trace_openai(event_name, info):
+    if event_name == "connection.connect_tcp.complete":
+        _count("openaiConnections")
+
+
+def _on_openai_request(request):
+    _count("openaiRequests")
+    # The SDK numbers its own retry attempts in this header
+    if request.headers.get("x-stainless-retry-count", "0") not in ("", "0"):
+        _count("openaiRetries")
+    request.extensions["trace"] = _trace_openai
+
+
+def get_openai_client(api_key):
+    """Process-wide OpenAI client sharing one keep-alive connection pool.
+
+    The SDK is imported on first use to keep worker start-up fast.
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                import httpx
+                from openai import OpenAI
+
+                pool_size = _setting("OPENAI_POOL_SIZE", "20")
+                timeout = _setting("OPENAI_TIMEOUT_SECONDS", "120", float)
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=pool_size,
+                        max_keepalive_connections=pool_size
+                    ),
+                    timeout=timeout,
+                    event_hooks={"request": [_on_openai_request]}
+                )
+                _openai_client = OpenAI(
+                    api_key=api_key,
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                    max_retries=_setting("OPENAI_MAX_RETRIES", "3"),
+                    timeout=timeout,
+                    http_client=http_client
+                )
+    return _openai_client
+
+
+def get_canvas_rate_limiter():
+    """Rate limiter shared by every Canvas call in the process, including the import poller."""
+    global _canvas_rate_limiter, _canvas_min_quota
+    if _canvas_rate_limiter is None:
+        with _lock:
+            if _canvas_rate_limiter is None:
+                # Canvas reports what is left of its request quota; below this every Canvas call backs off
+                _canvas_min_quota = _setting("CANVAS_MIN_QUOTA", "100", float)
+                _canvas_rate_limiter = RateLimiter(requests_per_minute=_setting("CANVAS_REQUESTS_PER_MINUTE", "0"))
+    return _canvas_rate_limiter
+
+
+def get_canvas_session():
+    """Process-wide requests Session for Canvas with pooled keep-alive connections.
+
+    Connection errors are retried for every method; 429 and 5xx answers only
+    for idempotent ones, so a POST that reached Canvas is never repeated.
+    """
+    global _canvas_session
+    if _canvas_session is None:
+        with _lock:
+            if _canvas_session is None:
+                _canvas_session = _build_canvas_session()
+    return _canvas_session
+
+
+def _build_canvas_session():
+    # requests is imported on first use, like the OpenAI SDK above
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class CountingRetry(Retry):
+        """urllib3 Retry that records every retry it allows."""
+
+        def increment(self, *args, **kwargs):
+            new_retry = super().increment(*args, **kwargs)
+            _count("canvasRetries")
+            return new_retry
+
+    class TimeoutSession(requests.Session):
+        """requests Session that applies a default timeout and Canvas throttling to every call."""
+
+        def __init__(self, timeout):
+            super().__init__()
+            self.timeout = timeout
+
+        def request(self, method, url, **kwargs):
+            kwargs.setdefault("timeout", self.timeout)
+            get_canvas_rate_limiter().acquire()
+            response = super().request(method, url, **kwargs)
+            _respect_canvas_throttling(response)
+            return response
+
+    pool_size = _setting("CANVAS_POOL_SIZE", "20")
+    retry = CountingRetry(
+        total=_setting("CANVAS_MAX_RETRIES", "3"),
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry
+    )
+    session = TimeoutSession(_setting("CANVAS_TIMEOUT_SECONDS", "30", float))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _respect_canvas_throttling(response):
+    """Slow every Canvas call down when Canvas says its quota is nearly used up."""
+    # Canvas answers 403 "Rate Limit Exceeded" once the quota is gone
+    if response.status_code == 403 and "Rate Limit Exceeded" in response.text:
+        get_canvas_rate_limiter().pause(CANVAS_BACKOFF_SECONDS * 5)
+        return
+    try:
+        remaining = float(response.headers.get("X-Rate-Limit-Remaining", ""))
+    except ValueError:
+        return
+    limiter = get_canvas_rate_limiter()
+    if remaining < _canvas_min_quota:
+        limiter.pause(CANVAS_BACKOFF_SECONDS)
+
+
+def client_stats():
+    """Request, connection and retry counters for the shared clients."""
+    canvas_requests = 0
+    canvas_connections = 0
+    if _canvas_session is not None:
+        for adapter in set(_canvas_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    canvas_requests += pool.num_requests
+                    canvas_connections += pool.num_connections
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["openaiReusedConnections"] = max(0, stats["openaiRequests"] - stats["openaiConnections"])
+    stats["canvasRequests"] = canvas_requests
+    stats["canvasConnections"] = canvas_connections
+    stats["canvasReusedConnections"] = max(0, canvas_requests - canvas_connections)
+    return stats
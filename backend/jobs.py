@@ -0,0 +1,240 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job."""
+
+
+class Job:
+    """State of one background job, updated by the worker running it."""
+
+    def __init__(self, kind):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"
+        self.stage = "queued"
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.updated_at = self.created_at
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def report(self, stage, progress=None):
+        """Record the stage the job is in and, optionally, its progress (0-100)."""
+        with self._lock:
+            self.stage = stage
+            if progress is not None:
+                self.progress = max(0, min(100, int(progress)))
+            self.updated_at = datetime.now().isoformat()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "jobId": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": self.progress,
+                "result": self.result,
+                "error": self.error,
+                "createdAt": self.created_at,
+                "updatedAt": self.updated_at,
+            }
+
+
+def _execute(job, fn, args, kwargs):
+    """Run fn(job, *args, **kwargs), recording its result or error on job."""
+    with job._lock:
+        job.status = "running"
+    try:
+        result = fn(job, *args, **kwargs)
+        with job._lock:
+            job.result = result
+            job.status = "completed"
+            job.stage = "done"
+            job.progress = 100
+    except Exception as e:
+        print(f"❌ Job {job.id} failed: {e}")
+        with job._lock:
+            job.error = str(e)
+            job.status = "failed"
+    finally:
+        with job._lock:
+            job.finished_at = time.time()
+            job.updated_at = datetime.now().isoformat()
+
+
+class JobQueue:
+    """Bounded worker pool that runs jobs in the background and keeps their state.
+
+    At most ``workers`` jobs run at once and at most ``max_depth`` more may wait
+    for a free worker; ``submit`` raises ``QueueFullError`` beyond that.
+    Finished jobs are kept for ``ttl`` seconds so clients can collect results.
+    """
+
+    def __init__(self, workers=4, max_depth=32, ttl=3600):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quiz-job")
+        self._jobs = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """Queue ``fn(job, *args, **kwargs)``; its return value becomes the job result."""
+        with self._lock:
+            self._prune()
+            if self._active >= self.workers + self.max_depth:
+                raise QueueFullError(f"Job queue is full ({self._active} jobs pending)")
+            job = Job(kind)
+            self._jobs[job.id] = job
+            self._active += 1
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+            return {
+                "workers": self.workers,
+                "maxDepth": self.max_depth,
+                "running": running,
+                "queued": self._active - running,
+                "tracked": len(self._jobs),
+            }
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            _execute(job, fn, args, kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class Batch:
+    """Jobs submitted together. Each item succeeds or fails on its own."""
+
+    def __init__(self, kind, names):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.names = list(names)
+        self.jobs = [Job(kind) for _ in self.names]
+        self.created_at = datetime.now().isoformat()
+
+    @property
+    def finished_at(self):
+        finished = [job.finished_at for job in self.jobs]
+        return None if None in finished else max(finished, default=0)
+
+    def to_dict(self):
+        items = []
+        for index, (name, job) in enumerate(zip(self.names, self.jobs)):
+            item = job.to_dict()
+            item["index"] = index
+            item["name"] = name
+            items.append(item)
+        counts = {status: sum(1 for item in items if item["status"] == status)
+                  for status in ("queued", "running", "completed", "failed")}
+        if counts["queued"] or counts["running"]:
+            status = "running"
+        elif counts["failed"] == 0:
+            status = "completed"
+        else:
+            status = "partial" if counts["completed"] else "failed"
+        return {
+            "batchId": self.id,
+            "kind": self.kind,
+            "status": status,
+            "progress": sum(item["progress"] for item in items) // len(items) if items else 100,
+            "total": len(items),
+            "counts": counts,
+            "items": items,
+            "createdAt": self.created_at,
+        }
+
+
+class BatchQueue:
+    """Runs the items of every batch on one bounded worker pool.
+
+    At most ``workers`` items run at once across all batches, so a large batch
+    cannot monopolise the OpenAI and Canvas limits. Items wait in submission
+    order, and finished batches are kept for ``ttl`` seconds. Every waiting
+    item holds its PDF in memory, so at most ``max_pending`` items may be
+    queued or running in total; ``submit`` raises ``QueueFullError`` for a
+    batch that would go past that.
+    """
+
+    def __init__(self, workers=4, max_items=50, max_pending=200, ttl=3600):
+        self.workers = workers
+        self.max_items = max_items
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quiz-batch")
+        self._batches = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, items):
+        """Queue ``fn(job, *args)`` for every (name, args) pair in items; returns the Batch."""
+        items = list(items)
+        if len(items) > self.max_items:
+            raise QueueFullError(f"A batch may hold at most {self.max_items} items")
+        batch = Batch(kind, [name for name, _ in items])
+        with self._lock:
+            self._prune()
+            if self._pending + len(items) > self.max_pending:
+                raise QueueFullError(f"Batch queue is full ({self._pending} items pending)")
+            self._batches[batch.id] = batch
+            self._pending += len(items)
+        for job, (_, args) in zip(batch.jobs, items):
+            self._executor.submit(self._run, job, fn, args)
+        return batch
+
+    def get(self, batch_id):
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def stats(self):
+        with self._lock:
+            jobs = [job for batch in self._batches.values() for job in batch.jobs]
+            return {
+                "workers": self.workers,
+                "maxItems": self.max_items,
+                "maxPending": self.max_pending,
+                "pending": self._pending,
+                "batches": len(self._batches),
+                "running": sum(1 for job in jobs if job.status == "running"),
+                "queued": sum(1 for job in jobs if job.status == "queued"),
+            }
+
+    def _run(self, job, fn, args):
+        try:
+            _execute(job, fn, args, {})
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [batch_id for batch_id, batch in self._batches.items()
+                   if batch.finished_at is not None and batch.finished_at < cutoff]
+        for batch_id in expired:
+            del self._batches[batch_id]
@@ -0,0 +1,176 @@
+import contextvars
+import json
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Seconds, from a cache hit up to a slow multi-chunk generation or Canvas import
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1 KB .. 256 MB
+PAGE_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 300, 500, 1000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _snake_case(name):
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(key + (("le", _format_value(float(bound))),))
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Histograms and scrape-time gauges rendered in the Prometheus text format.
+
+    Gauges come from stats callbacks (the dicts behind /cache-stats, /jobs and
+    /http-stats): every numeric field becomes <prefix>_<field in snake_case>.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, buckets=TIME_BUCKETS, labelnames=()):
+        metric = Histogram(name, help_text, buckets, labelnames)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix, stats_fn):
+        with self._lock:
+            self._collectors.append((prefix, stats_fn))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for prefix, stats_fn in collectors:
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                print(f"⚠️ Warning: Could not collect {prefix} stats: {e}")
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{_snake_case(key)}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# === Request Ids and Structured Logs ===
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id):
+    """Make request_id the id of everything logged from this context; returns a reset token."""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def bind_context(fn):
+    """Wrap fn so it runs with the caller's request id when called from another thread."""
+    context = contextvars.copy_context()
+
+    def bound(*args, **kwargs):
+        # Each call gets its own copy so several threads can run the same bound function
+        return context.copy().run(fn, *args, **kwargs)
+
+    return bound
+
+
+def log_event(event, **fields):
+    """Print one JSON log line tagged with the current request id."""
+    record = {"ts": datetime.now().isoformat(), "event": event, "requestId": current_request_id()}
+    record.update(fields)
+    print(json.dumps(record, default=str), flush=True)
+
+
+@contextmanager
+def timed_span(histogram, stage, **fields):
+    """Time the enclosed block into histogram{stage=...} and log it as a "span" event.
+
+    Yields a dict; anything the block puts in it is added to the log line.
+    """
+    extra = {}
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield extra
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        histogram.observe(seconds, stage=stage)
+        log_event("span", stage=stage, durationMs=round(seconds * 1000, 2), outcome=outcome, **{**fields, **extra})
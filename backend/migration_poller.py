@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+
+class MigrationStatus:
+    """Last known state of one Canvas content migration."""
+
+    def __init__(self, progress_url):
+        self.id = str(uuid.uuid4())
+        self.progress_url = progress_url
+        self.state = "queued"
+        self.completion = 0
+        self.polls = 0
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.updated_at = self.created_at
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "migrationId": self.id,
+            "state": self.state,
+            "completion": self.completion,
+            "polls": self.polls,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+        }
+
+
+class MigrationPoller:
+    """Tracks every outstanding Canvas migration from one background event loop.
+
+    Each migration is polled with exponential backoff: the delay grows by
+    `backoff` after every poll that shows no new progress, up to max_delay.
+    At most max_concurrency progress requests are in flight at once, no
+    matter how many migrations are tracked. Callers get a MigrationStatus
+    back immediately and can query it, wait on it, or pass an on_done callback.
+    """
+
+    def __init__(self, session_factory, max_concurrency=4, initial_delay=1.0, max_delay=15.0,
+                 backoff=1.6, timeout=600, retention=3600):
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self.retention = retention
+        self._statuses = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="canvas-poll")
+
+    def track(self, progress_url, headers, on_done=None):
+        """Start polling progress_url; returns its MigrationStatus right away."""
+        status = MigrationStatus(progress_url)
+        with self._lock:
+            self._prune()
+            self._statuses[status.id] = status
+        loop = self._ensure_loop()
+        asyncio.run_coroutine_threadsafe(self._poll(status, headers, on_done), loop)
+        return status
+
+    def get(self, migration_id):
+        with self._lock:
+            return self._statuses.get(migration_id)
+
+    def wait(self, migration_id, timeout=None):
+        """Block until the migration finishes (or timeout); returns its status."""
+        status = self.get(migration_id)
+        if status is not None:
+            status.done.wait(timeout)
+        return status
+
+    def stats(self):
+        with self._lock:
+            active = sum(1 for status in self._statuses.values() if not status.done.is_set())
+            return {"active": active, "tracked": len(self._statuses), "maxConcurrency": self.max_concurrency}
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run, name="canvas-poller", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    async def _poll(self, status, headers, on_done):
+        loop = asyncio.get_running_loop()
+        session = self.session_factory()
+        deadline = time.time() + self.timeout
+        delay = self.initial_delay
+        status.state = "running"
+        try:
+            while True:
+                async with self._semaphore:
+                    response = await loop.run_in_executor(
+                        self._executor, partial(session.get, status.progress_url, headers=headers))
+                response.raise_for_status()
+                progress_data = response.json()
+                state = progress_data.get("workflow_state")
+                completion = progress_data.get("completion") or 0
+                status.polls += 1
+                status.updated_at = datetime.now().isoformat()
+                advanced = completion > status.completion
+                status.completion = completion
+                if state == "completed":
+                    status.state = "completed"
+                    print(f"Import completed! Quiz has been created in Canvas ({status.polls} polls).")
+                    break
+                if state == "failed":
+                    status.state = "failed"
+                    status.error = f"Import failed: {progress_data}"
+                    break
+                if time.time() + delay > deadline:
+                    status.state = "timeout"
+                    status.error = f"Still processing after {self.timeout}s; last progress {completion}%"
+                    break
+                await asyncio.sleep(delay)
+                # Keep polling at the same pace while progress moves; back off while it stalls
+                if not advanced:
+                    delay = min(self.max_delay, delay * self.backoff)
+        except Exception as e:
+            status.state = "failed"
+            status.error = str(e)
+        finally:
+            status.finished_at = time.time()
+            status.updated_at = datetime.now().isoformat()
+            status.done.set()
+            if status.error:
+                print(f"⚠️ Warning: Canvas migration {status.id}: {status.error}")
+            if on_done is not None:
+                try:
+                    on_done(status)
+                except Exception as e:
+                    print(f"⚠️ Warning: Migration callback failed: {e}")
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [migration_id for migration_id, status in self._statuses.items()
+                   if status.finished_at is not None and status.finished_at < cutoff]
+        for migration_id in expired:
+            del self._statuses[migration_id]
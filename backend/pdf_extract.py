@@ -0,0 +1,145 @@
+import io
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+ExtractedText = namedtuple("ExtractedText", "text pages_total pages_read truncated")
+
+# Documents shorter than this are extracted in-process; the pool only pays off on long ones
+PARALLEL_MIN_PAGES = 24
+# Every task is sent the whole PDF and parses it again, so pages are split into about one
+# range per worker rather than many small ones; ranges never go below MIN_PAGES_PER_TASK
+MIN_PAGES_PER_TASK = 16
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _open(source):
+    # Imported on first use so loading this module stays cheap
+    from PyPDF2 import PdfReader
+    return PdfReader(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+
+
+def _extract_range(source, start, stop):
+    """Worker entry point: text of pages [start, stop) as a list of strings."""
+    reader = _open(source)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # By now the server runs request, job and poller threads; forking it could copy a lock
+            # another thread holds and hang the child, so workers start from a clean process instead
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _take(parts, page_texts, budget):
+    """Append page texts to parts until budget chars are used; return (chars used, pages taken)."""
+    used = 0
+    for taken, page_text in enumerate(page_texts):
+        if budget is not None and used + len(page_text) >= budget:
+            parts.append(page_text[:budget - used])
+            return budget, taken + 1
+        parts.append(page_text)
+        used += len(page_text)
+    return used, len(page_texts)
+
+
+def _read_pages(reader, parts, start, stop, max_chars):
+    """Extract pages start..stop in this process; return (chars used, pages read)."""
+    chars = 0
+    pages_read = 0
+    for i in range(start, min(stop, len(reader.pages))):
+        budget = None if max_chars is None else max_chars - chars
+        used, taken = _take(parts, [reader.pages[i].extract_text() or ""], budget)
+        chars += used
+        pages_read += taken
+        if max_chars is not None and chars >= max_chars:
+            break
+    return chars, pages_read
+
+
+def extract_text(source, max_pages=None, max_chars=None, workers=None):
+    """Extract the text of a PDF given as a path or as bytes.
+
+    Pages are split into ranges that run on a shared process pool and are
+    joined once at the end. Extraction stops after ``max_pages`` pages or
+    ``max_chars`` characters, whichever comes first; with ``max_chars`` the
+    first pages are read in-process and only the pages the remaining budget
+    is estimated to need are sent to the pool.
+    """
+    reader = _open(source)
+    pages_total = len(reader.pages)
+    pages_wanted = min(pages_total, max_pages) if max_pages else pages_total
+    workers = workers or os.cpu_count() or 1
+
+    parts = []
+    chars = 0
+    pages_read = 0
+    start = pages_wanted
+    if pages_wanted < PARALLEL_MIN_PAGES or workers < 2:
+        chars, pages_read = _read_pages(reader, parts, 0, pages_wanted, max_chars)
+    elif max_chars is None:
+        start = 0
+    else:
+        # Read a first stretch in-process: small budgets usually end here, and
+        # otherwise it tells how many more pages the budget needs
+        chars, pages_read = _read_pages(reader, parts, 0, MIN_PAGES_PER_TASK, max_chars)
+        if chars < max_chars:
+            start = pages_read
+
+    while start < pages_wanted:
+        stop = pages_wanted
+        if max_chars is not None:
+            chars_per_page = max(1, chars // max(1, pages_read))
+            # A quarter extra so one estimate usually covers the budget
+            estimate = -(-(max_chars - chars) * 5 // (4 * chars_per_page))
+            stop = min(pages_wanted, start + max(MIN_PAGES_PER_TASK, estimate))
+        pages_per_task = max(MIN_PAGES_PER_TASK, -(-(stop - start) // workers))
+        ranges = [(first, min(first + pages_per_task, stop))
+                  for first in range(start, stop, pages_per_task)]
+        try:
+            pool = _get_pool(workers)
+            futures = [pool.submit(_extract_range, source, first, last) for first, last in ranges]
+        except BrokenProcessPool:
+            _reset_pool()
+            return extract_text(source, max_pages, max_chars, workers=1)
+        try:
+            # Collect in page order so the character budget cuts at the right place
+            for future in futures:
+                budget = None if max_chars is None else max_chars - chars
+                used, taken = _take(parts, future.result(), budget)
+                chars += used
+                pages_read += taken
+                if max_chars is not None and chars >= max_chars:
+                    break
+        except BrokenProcessPool:
+            _reset_pool()
+            return extract_text(source, max_pages, max_chars, workers=1)
+        finally:
+            for future in futures:
+                future.cancel()
+        start = pages_wanted if max_chars is not None and chars >= max_chars else stop
+
+    return ExtractedText(
+        text="".join(parts),
+        pages_total=pages_total,
+        pages_read=pages_read,
+        truncated=pages_read < pages_total or (max_chars is not None and chars >= max_chars),
+    )
@@ -0,0 +1,55 @@
+import hashlib
+import os
+import threading
+import time
+
+
+class TemplateFile:
+    """A text file kept in memory and reloaded when it changes on disk.
+
+    The file is read once when the object is created. After that, its mtime
+    and size are checked at most once every check_interval seconds, so
+    requests normally read the text without any file I/O and edits still
+    show up without a restart.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = time.monotonic()
+        self._signature, self._text, self._digest = self._read()
+
+    def text(self):
+        self._refresh()
+        return self._text
+
+    def digest(self):
+        """SHA-256 of the file's current bytes."""
+        self._refresh()
+        return self._digest
+
+    def _read(self):
+        with open(self.path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            data = file.read()
+        # Same newline handling as reading the file in text mode
+        text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        return (stat.st_mtime_ns, stat.st_size), text, hashlib.sha256(data).hexdigest()
+
+    def _refresh(self):
+        if time.monotonic() - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked < self.check_interval:
+                return
+            self._checked = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_mtime_ns, stat.st_size) == self._signature:
+                    return
+                self._signature, self._text, self._digest = self._read()
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"⚠️ Warning: Keeping the cached {self.path}: {e}")
+                return
+        print(f"🔄 Reloaded {self.path}")
@@ -0,0 +1,309 @@
+import hashlib
+import html
+import io
+import zipfile
+from datetime import date
+from xml.sax.saxutils import escape
+
+from quiz_parser import MULTIPLE_ANSWERS, MULTIPLE_CHOICE, TRUE_FALSE, parse_questions
+
+QTI_QUESTION_TYPES = {
+    MULTIPLE_CHOICE: "multiple_choice_question",
+    TRUE_FALSE: "true_false_question",
+    MULTIPLE_ANSWERS: "multiple_answers_question",
+}
+
+
+class QtiBuildError(Exception):
+    """Raised when quiz text is not in the format the QTI builder understands."""
+
+
+def parse_quiz(quiz_text):
+    """Parse cleaned quiz text (the text2qti subset quiz.txt uses) into Questions.
+
+    Raises QtiBuildError for the first malformed question.
+    """
+    questions = parse_questions(quiz_text)
+    if not questions:
+        raise QtiBuildError("No questions found")
+    for question in questions:
+        if question.problems:
+            raise QtiBuildError(f"Question {question.number} {question.problems[0]}")
+        if question.trailing:
+            raise QtiBuildError(f"Question {question.number} has unexpected text after its choices")
+    return questions
+
+
+def _html(text):
+    """text as one HTML paragraph, the way text2qti renders plain text.
+
+    text2qti runs question and choice text through Markdown; this builder
+    only supports plain text, so Markdown syntax such as *emphasis* or
+    `code` is kept as written.
+    """
+    return f"<p>{html.escape(text, quote=False)}</p>"
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# Earliest date a zip entry can hold
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# === Package Templates ===
+# Same layout and markup text2qti writes, so Canvas imports both identically
+MANIFEST_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<manifest identifier="text2qti_manifest_{assessment_hash}" xmlns="http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1" xmlns:lom="http://ltsc.ieee.org/xsd/imsccv1p1/LOM/resource" xmlns:imsmd="http://www.imsglobal.org/xsd/imsmd_v1p2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1 http://www.imsglobal.org/xsd/imscp_v1p1.xsd http://ltsc.ieee.org/xsd/imsccv1p1/LOM/resource http://www.imsglobal.org/profile/cc/ccv1p1/LOM/ccv1p1_lomresource_v1p0.xsd http://www.imsglobal.org/xsd/imsmd_v1p2 http://www.imsglobal.org/xsd/imsmd_v1p2p2.xsd">
+  <metadata>
+    <schema>IMS Content</schema>
+    <schemaversion>1.1.3</schemaversion>
+    <imsmd:lom>
+      <imsmd:general>
+        <imsmd:title>
+          <imsmd:string>QTI assessment generated by text2qti</imsmd:string>
+        </imsmd:title>
+      </imsmd:general>
+      <imsmd:lifeCycle>
+        <imsmd:contribute>
+          <imsmd:date>
+            <imsmd:dateTime>{date}</imsmd:dateTime>
+          </imsmd:date>
+        </imsmd:contribute>
+      </imsmd:lifeCycle>
+      <imsmd:rights>
+        <imsmd:copyrightAndOtherRestrictions>
+          <imsmd:value>yes</imsmd:value>
+        </imsmd:copyrightAndOtherRestrictions>
+        <imsmd:description>
+          <imsmd:string>Private (Copyrighted) - http://en.wikipedia.org/wiki/Copyright</imsmd:string>
+        </imsmd:description>
+      </imsmd:rights>
+    </imsmd:lom>
+  </metadata>
+  <organizations/>
+  <resources>
+    <resource identifier="text2qti_assessment_{assessment_hash}" type="imsqti_xmlv1p2">
+      <file href="text2qti_assessment_{assessment_hash}/text2qti_assessment_{assessment_hash}.xml"/>
+      <dependency identifierref="text2qti_dependency_{assessment_hash}"/>
+    </resource>
+    <resource identifier="text2qti_dependency_{assessment_hash}" type="associatedcontent/imscc_xmlv1p1/learning-application-resource" href="text2qti_assessment_{assessment_hash}/assessment_meta.xml">
+      <file href="text2qti_assessment_{assessment_hash}/assessment_meta.xml"/>
+    </resource>
+  </resources>
+</manifest>
+"""
+
+ASSESSMENT_META_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<quiz identifier="text2qti_assessment_{assessment_hash}" xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">
+  <title>Quiz</title>
+  <description></description>
+  <shuffle_answers>false</shuffle_answers>
+  <scoring_policy>keep_highest</scoring_policy>
+  <hide_results></hide_results>
+  <quiz_type>assignment</quiz_type>
+  <points_possible>{points}</points_possible>
+  <require_lockdown_browser>false</require_lockdown_browser>
+  <require_lockdown_browser_for_results>false</require_lockdown_browser_for_results>
+  <require_lockdown_browser_monitor>false</require_lockdown_browser_monitor>
+  <lockdown_browser_monitor_data/>
+  <show_correct_answers>true</show_correct_answers>
+  <anonymous_submissions>false</anonymous_submissions>
+  <could_be_locked>false</could_be_locked>
+  <allowed_attempts>1</allowed_attempts>
+  <one_question_at_a_time>false</one_question_at_a_time>
+  <cant_go_back>false</cant_go_back>
+  <available>false</available>
+  <one_time_results>false</one_time_results>
+  <show_correct_answers_last_attempt>false</show_correct_answers_last_attempt>
+  <only_visible_to_overrides>false</only_visible_to_overrides>
+  <module_locked>false</module_locked>
+  <assignment identifier="text2qti_assignment_{assessment_hash}">
+    <title>Quiz</title>
+    <due_at/>
+    <lock_at/>
+    <unlock_at/>
+    <module_locked>false</module_locked>
+    <workflow_state>unpublished</workflow_state>
+    <assignment_overrides>
+    </assignment_overrides>
+    <quiz_identifierref>text2qti_assessment_{assessment_hash}</quiz_identifierref>
+    <allowed_extensions></allowed_extensions>
+    <has_group_category>false</has_group_category>
+    <points_possible>{points}</points_possible>
+    <grading_type>points</grading_type>
+    <all_day>false</all_day>
+    <submission_types>online_quiz</submission_types>
+    <position>1</position>
+    <turnitin_enabled>false</turnitin_enabled>
+    <vericite_enabled>false</vericite_enabled>
+    <peer_review_count>0</peer_review_count>
+    <peer_reviews>false</peer_reviews>
+    <automatic_peer_reviews>false</automatic_peer_reviews>
+    <anonymous_peer_reviews>false</anonymous_peer_reviews>
+    <grade_group_students_individually>false</grade_group_students_individually>
+    <freeze_on_copy>false</freeze_on_copy>
+    <omit_from_final_grade>false</omit_from_final_grade>
+    <intra_group_peer_reviews>false</intra_group_peer_reviews>
+    <only_visible_to_overrides>false</only_visible_to_overrides>
+    <post_to_sis>false</post_to_sis>
+    <moderated_grading>false</moderated_grading>
+    <grader_count>0</grader_count>
+    <grader_comments_visible_to_graders>true</grader_comments_visible_to_graders>
+    <anonymous_grading>false</anonymous_grading>
+    <graders_anonymous_to_graders>false</graders_anonymous_to_graders>
+    <grader_names_visible_to_final_grader>true</grader_names_visible_to_final_grader>
+    <anonymous_instructor_annotations>false</anonymous_instructor_annotations>
+    <post_policy>
+      <post_manually>false</post_manually>
+    </post_policy>
+  </assignment>
+  <assignment_group_identifierref>text2qti_assignment-group_{assessment_hash}</assignment_group_identifierref>
+  <assignment_overrides>
+  </assignment_overrides>
+</quiz>
+"""
+
+ASSESSMENT_HEAD_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<questestinterop xmlns="http://www.imsglobal.org/xsd/ims_qtiasiv1p2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.imsglobal.org/xsd/ims_qtiasiv1p2 http://www.imsglobal.org/xsd/ims_qtiasiv1p2p1.xsd">
+  <assessment ident="text2qti_assessment_{assessment_hash}" title="Quiz">
+    <qtimetadata>
+      <qtimetadatafield>
+        <fieldlabel>cc_maxattempts</fieldlabel>
+        <fieldentry>1</fieldentry>
+      </qtimetadatafield>
+    </qtimetadata>
+    <section ident="root_section">
+"""
+
+ASSESSMENT_TAIL = """    </section>
+  </assessment>
+</questestinterop>
+"""
+
+
+ITEM_TEMPLATE = """      <item ident="text2qti_question_{question_hash}" title="Question">
+        <itemmetadata>
+          <qtimetadata>
+            <qtimetadatafield>
+              <fieldlabel>question_type</fieldlabel>
+              <fieldentry>{question_type}</fieldentry>
+            </qtimetadatafield>
+            <qtimetadatafield>
+              <fieldlabel>points_possible</fieldlabel>
+              <fieldentry>1</fieldentry>
+            </qtimetadatafield>
+            <qtimetadatafield>
+              <fieldlabel>original_answer_ids</fieldlabel>
+              <fieldentry>{answer_ids}</fieldentry>
+            </qtimetadatafield>
+            <qtimetadatafield>
+              <fieldlabel>assessment_question_identifierref</fieldlabel>
+              <fieldentry>text2qti_question_ref_{question_hash}</fieldentry>
+            </qtimetadatafield>
+          </qtimetadata>
+        </itemmetadata>
+        <presentation>
+          <material>
+            <mattext texttype="text/html">{question_html}</mattext>
+          </material>
+          <response_lid ident="response1" rcardinality="{cardinality}">
+            <render_choice>
+{choice_labels}            </render_choice>
+          </response_lid>
+        </presentation>
+        <resprocessing>
+          <outcomes>
+            <decvar maxvalue="100" minvalue="0" varname="SCORE" vartype="Decimal"/>
+          </outcomes>
+          <respcondition continue="No">
+            <conditionvar>
+{condition}            </conditionvar>
+            <setvar action="Set" varname="SCORE">100</setvar>
+          </respcondition>
+        </resprocessing>
+      </item>
+"""
+
+CHOICE_TEMPLATE = """              <response_label ident="text2qti_choice_{choice_hash}">
+                <material>
+                  <mattext texttype="text/html">{choice_html}</mattext>
+                </material>
+              </response_label>
+"""
+
+
+def _item_xml(question, question_hash):
+    choice_hashes = [_digest(question_hash, str(i), text) for i, (text, _) in enumerate(question.choices)]
+    choice_labels = "".join(
+        CHOICE_TEMPLATE.format(choice_hash=choice_hash, choice_html=escape(_html(text)))
+        for choice_hash, (text, _) in zip(choice_hashes, question.choices)
+    )
+    if question.kind == MULTIPLE_ANSWERS:
+        cardinality = "Multiple"
+        conditions = []
+        for choice_hash, (_, correct) in zip(choice_hashes, question.choices):
+            varequal = f'<varequal respident="response1">text2qti_choice_{choice_hash}</varequal>'
+            if correct:
+                conditions.append(f"                {varequal}\n")
+            else:
+                conditions.append(f"                <not>\n                  {varequal}\n                </not>\n")
+        condition = "              <and>\n" + "".join(conditions) + "              </and>\n"
+    else:
+        cardinality = "Single"
+        correct_hash = next(h for h, (_, correct) in zip(choice_hashes, question.choices) if correct)
+        condition = f'              <varequal respident="response1">text2qti_choice_{correct_hash}</varequal>\n'
+    return ITEM_TEMPLATE.format(
+        question_hash=question_hash,
+        question_type=QTI_QUESTION_TYPES[question.kind],
+        answer_ids=",".join(f"text2qti_choice_{h}" for h in choice_hashes),
+        question_html=escape(_html(question.text)),
+        cardinality=cardinality,
+        choice_labels=choice_labels,
+        condition=condition,
+    )
+
+
+def _write(archive, name, data):
+    # A fixed timestamp keeps the zip bytes from depending on when it was built
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    if name.endswith("/"):
+        info.external_attr = 0o40755 << 16 | 0x10
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+    archive.writestr(info, data)
+
+
+def build_qti_zip(quiz_text):
+    """Build the QTI package text2qti would produce for quiz_text, as zip bytes.
+
+    Identifiers are derived from the question and choice text and every
+    entry has the same timestamp, so the same quiz always yields the same
+    package; only the manifest's creation date changes from day to day.
+    Raises QtiBuildError on malformed text.
+    """
+    questions = parse_quiz(quiz_text)
+    question_hashes = [_digest(str(i), q.text, *(text for text, _ in q.choices)) for i, q in enumerate(questions)]
+    assessment_hash = _digest(*question_hashes)
+    points = f"{float(len(questions))}"
+
+    assessment_xml = (
+        ASSESSMENT_HEAD_TEMPLATE.format(assessment_hash=assessment_hash)
+        + "".join(_item_xml(q, h) for q, h in zip(questions, question_hashes))
+        + ASSESSMENT_TAIL
+    )
+    folder = f"text2qti_assessment_{assessment_hash}"
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        _write(archive, "imsmanifest.xml", MANIFEST_TEMPLATE.format(
+            assessment_hash=assessment_hash, date=date.today().isoformat()))
+        _write(archive, "non_cc_assessments/", "")
+        _write(archive, f"{folder}/assessment_meta.xml", ASSESSMENT_META_TEMPLATE.format(
+            assessment_hash=assessment_hash, points=points))
+        _write(archive, f"{folder}/{folder}.xml", assessment_xml)
+    return buffer.getvalue()
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+from quiz_parser import check_quiz, parse_questions, question_kind
+
+# Terms are hashed into a fixed number of columns, so the index never needs a vocabulary
+FEATURES = 2048
+TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how in is it its not of on or that the "
+    "their there these this to was were what when which who why will with".split()
+)
+COURSE_FILE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+# numpy is imported on first use so importing this module (and aitoken) stays cheap
+np = None
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+def term_counts(text):
+    """Hashed unigram and bigram counts of text, as a FEATURES-long vector."""
+    words = [word for word in TOKEN.findall(text.lower()) if word not in STOP_WORDS]
+    counts = np.zeros(FEATURES, dtype=np.float32)
+    if not words:
+        return counts
+    terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    columns = np.fromiter((zlib.crc32(term.encode("utf-8")) % FEATURES for term in terms),
+                          dtype=np.int64, count=len(terms))
+    np.add.at(counts, columns, 1)
+    return counts
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _question_terms(question):
+    return term_counts(question.text + " " + " ".join(text for text, _ in question.choices))
+
+
+class _CourseIndex:
+    """In-memory copy of one course's bank file plus its vectors."""
+
+    def __init__(self, path, max_questions):
+        self.path = path
+        self.max_questions = max_questions
+        self.offset = 0
+        self.questions = []
+        self.question_counts = np.zeros((0, FEATURES), dtype=np.float32)
+        self.document_ids = []
+        self.document_vectors = np.zeros((0, FEATURES), dtype=np.float32)
+        self._question_vectors = None
+
+    def sync(self):
+        """Read records appended to the file since the last sync, by this or another worker."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A concurrent writer may be mid-line; leave the partial line for the next sync
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        self.offset += end
+        questions, question_counts, document_ids, document_vectors = [], [], [], []
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("type") == "question":
+                parsed = parse_questions(record["text"])
+                if parsed and parsed[0].valid:
+                    record["question"] = parsed[0]
+                    questions.append(record)
+                    question_counts.append(_question_terms(parsed[0]))
+            elif record.get("type") == "document":
+                vector = np.zeros(FEATURES, dtype=np.float32)
+                vector[record["columns"]] = record["counts"]
+                document_ids.append(record["id"])
+                document_vectors.append(np.log1p(vector))
+        if questions:
+            self.questions += questions
+            self.question_counts = np.vstack([self.question_counts, np.array(question_counts)])
+            if len(self.questions) > self.max_questions:
+                self.questions = self.questions[-self.max_questions:]
+                self.question_counts = self.question_counts[-self.max_questions:]
+            self._question_vectors = None
+        if document_ids:
+            self.document_ids += document_ids
+            self.document_vectors = np.vstack([self.document_vectors, _normalize(np.array(document_vectors))])
+
+    def idf(self):
+        df = (self.question_counts > 0).sum(axis=0)
+        return np.log((1 + len(self.questions)) / (1 + df)).astype(np.float32) + 1
+
+    def weigh(self, counts):
+        """TF-IDF vector(s) for term counts, L2-normalized."""
+        return _normalize(np.log1p(counts) * self.idf())
+
+    def question_vectors(self):
+        if self._question_vectors is None:
+            self._question_vectors = self.weigh(self.question_counts)
+        return self._question_vectors
+
+
+class BankPlan:
+    """What the bank contributes to one quiz request.
+
+    reused are stored questions used as-is; remaining are the questionCounts
+    still to generate. avoid lists prompts the model should not repeat, and
+    check(question) returns a problem for near-duplicates (or None). finish()
+    combines the final questions and stores the new ones in the bank.
+    """
+
+    def __init__(self, bank=None, course_id=None, source_text="", reused=(), remaining=None,
+                 spare=(), avoid=(), check=None):
+        self.bank = bank
+        self.course_id = course_id
+        self.source_text = source_text
+        self.reused = list(reused)
+        self.remaining = remaining or {}
+        self.spare = list(spare)
+        self.avoid = list(avoid)
+        self.check = check
+        self.topped_up = 0
+
+    @property
+    def needs_generation(self):
+        # Without any reuse, generate even when no counts were given, as before the bank existed
+        return bool(self.remaining) or not self.reused
+
+    def finish(self, generated):
+        """Reused plus generated questions, topped up from the bank where generation fell short."""
+        questions = self.reused + list(generated)
+        missing = check_quiz(list(generated), self.remaining).missing if self.remaining else {}
+        for q_type, count in missing.items():
+            kind = question_kind(q_type)
+            matches = [question for question in self.spare if question.kind == kind][:count]
+            questions += matches
+            self.topped_up += len(matches)
+            self.spare = [question for question in self.spare if question not in matches]
+        if self.bank is not None and generated:
+            try:
+                self.bank.add(self.course_id, self.source_text, generated)
+            except OSError as e:
+                print(f"⚠️ Warning: Could not store questions in the question bank: {e}")
+        return questions
+
+
+class QuestionBank:
+    """Per-course store of generated questions with a TF-IDF similarity index.
+
+    Each course has an append-only JSON-lines file under root_dir, which all
+    workers share and re-read incrementally. Every stored question remembers
+    the document it was generated from. When a new request's source text is
+    at least cover_similarity alike to a stored document, up to
+    reuse_fraction of each question type is filled from that document's
+    questions instead of OpenAI. Generated questions at least
+    duplicate_similarity alike to a banked question, or to another question
+    in the same quiz, are rejected so they get regenerated.
+    """
+
+    def __init__(self, root_dir, reuse_fraction=0.5, duplicate_similarity=0.85, cover_similarity=0.8,
+                 max_questions=2000, max_courses=32, max_avoid=30):
+        self.root_dir = root_dir
+        self.reuse_fraction = reuse_fraction
+        self.duplicate_similarity = duplicate_similarity
+        self.cover_similarity = cover_similarity
+        self.max_questions = max_questions
+        self.max_courses = max_courses
+        self.max_avoid = max_avoid
+        self._courses = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.stored = 0
+        self.duplicates = 0
+        os.makedirs(root_dir, exist_ok=True)
+
+    def plan(self, course_id, source_text, question_counts, reuse=True):
+        """Decide which questions come from the bank for a request; returns a BankPlan."""
+        if not course_id:
+            return BankPlan(remaining=question_counts)
+        _load_numpy()
+        counts = {q_type: int(count or 0) for q_type, count in (question_counts or {}).items() if int(count or 0) > 0}
+        with self._lock:
+            index = self._index(course_id)
+            covered = set()
+            if index.document_ids:
+                source = _normalize(np.log1p(term_counts(source_text)))
+                similarity = index.document_vectors @ source
+                covered = {index.document_ids[i] for i in np.flatnonzero(similarity >= self.cover_similarity)}
+            candidates = [record["question"] for record in index.questions if record["document"] in covered]
+            question_vectors = index.question_vectors()
+            idf = index.idf()
+
+        random.shuffle(candidates)
+        reused = []
+        remaining = dict(counts)
+        if reuse and self.reuse_fraction > 0:
+            for q_type, count in counts.items():
+                kind = question_kind(q_type)
+                take = [question for question in candidates if question.kind == kind][:int(count * self.reuse_fraction)]
+                reused += take
+                remaining[q_type] = count - len(take)
+            remaining = {q_type: count for q_type, count in remaining.items() if count > 0}
+        # Fresh requests never get stored questions, not even to fill a shortfall
+        spare = [question for question in candidates if question not in reused] if reuse else []
+        avoid = [question.text for question in candidates[:self.max_avoid]]
+        with self._lock:
+            self.reused += len(reused)
+        return BankPlan(self, course_id, source_text, reused, remaining, spare, avoid,
+                        self._duplicate_check(question_vectors, idf, reused))
+
+    def _duplicate_check(self, question_vectors, idf, accepted):
+        seen = [_normalize(np.log1p(_question_terms(question)) * idf) for question in accepted]
+
+        def check(question):
+            vector = _normalize(np.log1p(_question_terms(question)) * idf)
+            if len(question_vectors) and float(np.max(question_vectors @ vector)) >= self.duplicate_similarity:
+                problem = "repeats a question already in the course bank"
+            elif seen and float(np.max(np.array(seen) @ vector)) >= self.duplicate_similarity:
+                problem = "repeats another question in this quiz"
+            else:
+                seen.append(vector)
+                return None
+            with self._lock:
+                self.duplicates += 1
+            return problem
+
+        return check
+
+    def add(self, course_id, source_text, questions):
+        """Store valid questions and the document they came from in the course's bank."""
+        questions = [question for question in questions if question.valid]
+        if not course_id or not questions:
+            return
+        _load_numpy()
+        counts = term_counts(source_text)
+        columns = np.flatnonzero(counts)
+        document_id = hashlib.sha256(source_text.encode("utf-8")).hexdigest()
+        now = datetime.now().isoformat()
+        lines = [json.dumps({"type": "document", "id": document_id, "columns": columns.tolist(),
+                             "counts": counts[columns].astype(int).tolist(), "createdAt": now})]
+        for question in questions:
+            lines.append(json.dumps({"type": "question", "id": str(uuid.uuid4()), "kind": question.kind,
+                                     "text": question.render(1), "document": document_id, "createdAt": now}))
+        with self._lock:
+            index = self._index(course_id)
+            # One write per batch of lines keeps appends from different workers from interleaving
+            with open(index.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            index.sync()
+            self.stored += len(questions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "coursesLoaded": len(self._courses),
+                "questionsLoaded": sum(len(index.questions) for index in self._courses.values()),
+                "reused": self.reused,
+                "stored": self.stored,
+                "duplicatesRejected": self.duplicates,
+            }
+
+    def _index(self, course_id):
+        """The course's index, synced with its file. Call with self._lock held."""
+        name = str(course_id)
+        if not COURSE_FILE.match(name):
+            name = hashlib.sha256(name.encode("utf-8")).hexdigest()[:32]
+        index = self._courses.get(name)
+        if index is None:
+            index = self._courses[name] = _CourseIndex(os.path.join(self.root_dir, f"{name}.jsonl"),
+                                                      self.max_questions)
+            while len(self._courses) > self.max_courses:
+                self._courses.popitem(last=False)
+        self._courses.move_to_end(name)
+        index.sync()
+        return index
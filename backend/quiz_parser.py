@@ -0,0 +1,219 @@
+import re
+
+QUESTION_START = re.compile(r'^(\d+)[.)]\s+(.*)$')
+# "*a) text" as in quiz.txt; "A. text" and "a)text" are accepted and written back as "a) text"
+CHOICE = re.compile(r'^(\*)?\s*([a-zA-Z])(?:\)\s*|\.\s+)(.*)$')
+MULTI_ANSWER = re.compile(r'^\[\s*([*xX]?)\s*\]\s*(.*)$')
+
+MULTIPLE_CHOICE = "multiple_choice"
+TRUE_FALSE = "true_false"
+MULTIPLE_ANSWERS = "multiple_answers"
+
+
+class Question:
+    """One question parsed from model output.
+
+    kind is MULTIPLE_CHOICE, TRUE_FALSE or MULTIPLE_ANSWERS and choices is a
+    list of (text, correct) pairs. problems lists everything that would stop
+    the question from importing; the question is valid when it is empty.
+    trailing counts lines after the choices, which render() leaves out.
+    """
+
+    __slots__ = ("number", "text", "kind", "choices", "problems", "trailing")
+
+    def __init__(self, number, text):
+        self.number = number
+        self.text = text
+        self.kind = None
+        self.choices = []
+        self.problems = []
+        self.trailing = 0
+
+    @property
+    def valid(self):
+        return not self.problems
+
+    def render(self, number=None):
+        """The question in the quiz.txt format, numbered number (default: its own number)."""
+        lines = [f"{number if number is not None else self.number}. {self.text}"]
+        if self.kind == MULTIPLE_ANSWERS:
+            lines += [f"[{'*' if correct else ''}] {text}" for text, correct in self.choices]
+        else:
+            lines += [f"{'*' if correct else ''}{chr(ord('a') + i)}) {text}"
+                      for i, (text, correct) in enumerate(self.choices)]
+        return "\n".join(lines)
+
+
+def _finish(question):
+    correct = sum(1 for _, is_correct in question.choices if is_correct)
+    # True/False in either order, with or without trailing punctuation ("True.")
+    if question.kind == MULTIPLE_CHOICE and len(question.choices) == 2 and \
+            {text.strip().rstrip(".!?").lower() for text, _ in question.choices} == {"true", "false"}:
+        question.kind = TRUE_FALSE
+    if not question.text:
+        question.problems.append("has no question text")
+    if len(question.choices) < 2:
+        question.problems.append("has fewer than two choices")
+    elif question.kind == MULTIPLE_ANSWERS and correct < 1:
+        question.problems.append("has no correct choices")
+    elif question.kind != MULTIPLE_ANSWERS and correct != 1:
+        question.problems.append("needs exactly one correct choice")
+
+
+def parse_questions(quiz_text):
+    """Parse model output into Questions without raising.
+
+    Anything before the first numbered line is skipped. Malformed questions
+    are still returned, with their problems listed, so callers can replace
+    just those.
+    """
+    questions = []
+    current = None
+    for raw_line in quiz_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        start = QUESTION_START.match(line)
+        if start:
+            if current is not None:
+                _finish(current)
+            current = Question(int(start.group(1)), start.group(2).strip())
+            questions.append(current)
+            continue
+        if current is None:
+            continue
+        multi = MULTI_ANSWER.match(line)
+        choice = None if multi else CHOICE.match(line)
+        if current.trailing:
+            current.trailing += 1
+        elif multi or choice:
+            kind = MULTIPLE_ANSWERS if multi else MULTIPLE_CHOICE
+            if current.kind not in (None, kind):
+                if "mixes choice styles" not in current.problems:
+                    current.problems.append("mixes choice styles")
+            current.kind = current.kind or kind
+            if multi:
+                current.choices.append((multi.group(2).strip(), bool(multi.group(1))))
+            else:
+                current.choices.append((choice.group(3).strip(), bool(choice.group(1))))
+        elif not current.choices:
+            current.text += "\n" + line
+        else:
+            current.trailing = 1
+    if current is not None:
+        _finish(current)
+    return questions
+
+
+def render_quiz(questions):
+    """Quiz text for questions, numbered from 1 in order."""
+    return "\n\n".join(question.render(number) for number, question in enumerate(questions, 1))
+
+
+def question_kind(question_type):
+    """Map a questionCounts key ("multiple-choice", "True/False", ...) to a question kind, or None."""
+    name = re.sub(r'[^a-z]+', ' ', str(question_type).lower())
+    if "true" in name or "false" in name:
+        return TRUE_FALSE
+    if "select" in name or "all that apply" in name or "multiple answer" in name:
+        return MULTIPLE_ANSWERS
+    if "multiple choice" in name or "choice" in name:
+        return MULTIPLE_CHOICE
+    return None
+
+
+class QuizCheck:
+    """How parsed questions measure up against the requested questionCounts.
+
+    keep holds the valid questions to use, in order, at most the requested
+    number of each kind. missing maps each questionCounts key to how many
+    more questions of that type are needed. invalid lists the questions that
+    were dropped for problems.
+    """
+
+    def __init__(self, keep, missing, invalid):
+        self.keep = keep
+        self.missing = missing
+        self.invalid = invalid
+
+
+def check_quiz(questions, question_counts):
+    """Validate questions against question_counts ({type name: count})."""
+    wanted = {}
+    type_names = {}
+    for q_type, count in (question_counts or {}).items():
+        count = int(count or 0)
+        kind = question_kind(q_type)
+        if count > 0:
+            wanted[kind] = wanted.get(kind, 0) + count
+            type_names.setdefault(kind, q_type)
+
+    keep = []
+    invalid = []
+    have = {}
+    for question in questions:
+        if not question.valid:
+            invalid.append(question)
+            continue
+        if not wanted:
+            keep.append(question)
+            continue
+        # Types we cannot recognise count against any unrecognised request
+        kind = question.kind if question.kind in wanted else None
+        if kind not in wanted or have.get(kind, 0) >= wanted[kind]:
+            continue
+        have[kind] = have.get(kind, 0) + 1
+        keep.append(question)
+
+    missing = {}
+    for kind, count in wanted.items():
+        if have.get(kind, 0) < count:
+            missing[type_names[kind]] = count - have.get(kind, 0)
+    return QuizCheck(keep, missing, invalid)
+
+
+def splice_questions(questions, replacements):
+    """Put replacement questions where the invalid ones were; extra replacements go at the end."""
+    pool = [question for question in replacements if question.valid]
+    spliced = []
+    for question in questions:
+        if question.valid:
+            spliced.append(question)
+            continue
+        match = next((i for i, candidate in enumerate(pool) if candidate.kind == question.kind), None)
+        if match is None and pool:
+            match = 0
+        if match is not None:
+            spliced.append(pool.pop(match))
+    return spliced + pool
+
+
+def repair_quiz(quiz_text, question_counts, regenerate, max_rounds=1, check=None, avoid=()):
+    """Validate quiz_text and re-request only what is missing or malformed.
+
+    regenerate(missing_counts, avoid_questions) must return quiz text with
+    just the missing questions; avoid_questions holds the prompts already in
+    the quiz, plus avoid, so they are not repeated. check(question), when
+    given, returns a problem that makes an otherwise valid question count as
+    malformed, or None. Returns (questions, summary dict).
+    """
+    questions = _checked(parse_questions(quiz_text), check)
+    result = check_quiz(questions, question_counts)
+    summary = {"parsed": len(questions), "invalid": len(result.invalid), "regenerated": 0, "rounds": 0}
+    while result.missing and summary["rounds"] < max_rounds:
+        summary["rounds"] += 1
+        summary["regenerated"] += sum(result.missing.values())
+        replacements = regenerate(result.missing, [question.text for question in result.keep] + list(avoid))
+        questions = splice_questions(questions, _checked(parse_questions(replacements), check))
+        result = check_quiz(questions, question_counts)
+    summary["missing"] = result.missing
+    return result.keep, summary
+
+
+def _checked(questions, check):
+    if check is not None:
+        for question in questions:
+            problem = check(question) if question.valid else None
+            if problem:
+                question.problems.append(problem)
+    return questions
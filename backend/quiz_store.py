@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def stored_quiz_text(quiz_data, field="quizText"):
+    """Quiz text from a stored quiz; older documents keep it in "text" instead of "quizText"."""
+    other = "text" if field == "quizText" else "quizText"
+    return quiz_data.get(field) or quiz_data.get(other) or ""
+
+
+class QuizStore:
+    """Read-through TTL/LRU cache in front of the Firestore quizzes collection.
+
+    Missing documents are cached too, so repeated lookups of a bad id do not
+    reach Firestore. Writes made through save() invalidate the entry.
+    """
+
+    def __init__(self, get_db, collection="quizzes", max_entries=1024, ttl=60):
+        self._get_db = get_db
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reads = 0
+
+    def get(self, quiz_id):
+        """The quiz document as a dict, or None when it does not exist."""
+        cached = self._lookup(quiz_id)
+        if cached is not _MISSING:
+            return cached
+        doc = self._ref(quiz_id).get()
+        data = doc.to_dict() if doc.exists else None
+        with self._lock:
+            self.reads += 1
+        self._store(quiz_id, data)
+        return data
+
+    def get_many(self, quiz_ids):
+        """{id: dict or None} for every id, fetching all cache misses in one get_all call."""
+        found = {}
+        to_fetch = []
+        for quiz_id in dict.fromkeys(quiz_ids):
+            cached = self._lookup(quiz_id)
+            if cached is _MISSING:
+                to_fetch.append(quiz_id)
+            else:
+                found[quiz_id] = cached
+        if to_fetch:
+            docs = self._get_db().get_all([self._ref(quiz_id) for quiz_id in to_fetch])
+            with self._lock:
+                self.reads += 1
+            fetched = {doc.id: doc.to_dict() if doc.exists else None for doc in docs}
+            for quiz_id in to_fetch:
+                data = fetched.get(quiz_id)
+                self._store(quiz_id, data)
+                found[quiz_id] = data
+        return found
+
+    def save(self, quiz_id, data):
+        """Write a quiz document and drop any cached copy of it."""
+        self._ref(quiz_id).set(data)
+        self.invalidate(quiz_id)
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "firestoreReads": self.reads,
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+            }
+
+    def _ref(self, quiz_id):
+        return self._get_db().collection(self.collection).document(quiz_id)
+
+    def _lookup(self, quiz_id):
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(quiz_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return _MISSING
+
+    def _store(self, quiz_id, data):
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+            self._entries[quiz_id] = (data, time.time() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
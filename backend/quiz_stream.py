@@ -0,0 +1,65 @@
+import json
+import re
+
+from chunking import QUESTION_LINE
+
+QUIZ_START = re.compile(r'^\d+')
+
+
+def format_sse(event, data):
+    """Encode one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class QuestionStreamer:
+    """Turns streamed model output into complete question blocks.
+
+    Lines are cleaned the way clean_quiz_text does it: leading whitespace is
+    stripped and everything before the first numbered line is dropped. A
+    question is complete once the next numbered line arrives or the stream
+    is closed.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._lines = []
+        self._started = False
+
+    def feed(self, delta):
+        """Add streamed text; return the questions it completed."""
+        self._pending += delta
+        *complete, self._pending = self._pending.split("\n")
+        questions = []
+        for line in complete:
+            question = self._add_line(line)
+            if question:
+                questions.append(question)
+        return questions
+
+    def close(self):
+        """Flush the remaining text; return the last questions."""
+        questions = self.feed("\n")
+        last = self._flush()
+        if last:
+            questions.append(last)
+        return questions
+
+    def _add_line(self, line):
+        line = line.lstrip()
+        if not self._started:
+            if not QUIZ_START.match(line):
+                return None
+            self._started = True
+            self._lines = [line]
+            return None
+        if QUESTION_LINE.match(line):
+            question = self._flush()
+            self._lines = [line]
+            return question
+        self._lines.append(line)
+        return None
+
+    def _flush(self):
+        question = "\n".join(self._lines).strip()
+        self._lines = []
+        return question or None
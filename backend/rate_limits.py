@@ -0,0 +1,82 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at per_minute tokens a minute.
+
+    It starts full and holds at most one minute's worth of tokens. reserve()
+    always takes the tokens right away and returns how long the caller must
+    wait before using them, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self._rate = per_minute / 60.0
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Take amount tokens; returns the seconds to wait until they are available."""
+        # A request bigger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self._rate)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """Keeps calls to one API under a requests-per-minute and a tokens-per-minute limit.
+
+    A limit of 0 turns that bucket off. acquire() blocks the calling thread
+    until both buckets allow the call and any pause() has run out.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._stats_lock = threading.Lock()
+        self._paused_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens=0):
+        """Wait until a call using tokens tokens is allowed; returns the seconds waited."""
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._stats_lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+            self.calls += 1
+            if wait > 0:
+                self.throttled += 1
+                self.waited_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hold every call for seconds, e.g. after the server asked us to slow down."""
+        with self._stats_lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "requestsPerMinute": self.requests.per_minute if self.requests else 0,
+                "tokensPerMinute": self.tokens.per_minute if self.tokens else 0,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "waitedSeconds": round(self.waited_seconds, 3),
+            }
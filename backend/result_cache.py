@@ -0,0 +1,128 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def generation_key(doc_hash, question_counts, instructions, course_id, model, template_hash):
+    """Cache key for one generation: every input that can change the model's output."""
+    payload = json.dumps({
+        "doc": doc_hash,
+        "counts": {str(k): int(v or 0) for k, v in (question_counts or {}).items()},
+        "instructions": (instructions or "").strip(),
+        "course": course_id,
+        "model": model,
+        "template": template_hash,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """TTL + LRU cache of generated quizzes with single-flight de-duplication.
+
+    Concurrent calls for the same key share one computation: the first caller
+    runs it and the others wait for its result instead of calling upstream.
+    """
+
+    def __init__(self, max_entries=256, ttl=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, bypass=False, keep=None):
+        """Return the cached value for key, or compute() it once for all concurrent callers.
+
+        With bypass the cache and any in-flight call are ignored; the fresh
+        value still replaces the cached one. When keep(value) is false the
+        value is returned (and shared with waiting callers) but not cached.
+        """
+        if bypass:
+            with self._lock:
+                self.bypassed += 1
+            value = compute()
+            if keep is None or keep(value):
+                self.put(key, value)
+            return value
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = Future()
+                self._in_flight[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            if keep is None or keep(value):
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def peek(self, key):
+        """Return the cached value for key, or None; never waits on an in-flight call."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time() + self.ttl)
+            now = time.time()
+            expired = [k for k, (_, expires) in self._entries.items() if expires <= now]
+            for k in expired:
+                del self._entries[k]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "inFlight": len(self._in_flight),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+            }
@@ -0,0 +1,33 @@
+from chunking import chunk_work, generate_in_chunks
+
+LONG_TEXT = "\n\n".join(f"Paragraph {i} " + "word " * 200 for i in range(20))
+
+
+def test_counts_are_shared_between_chunks():
+    work = chunk_work(LONG_TEXT, {"multiple-choice": 10, "true-false": 3}, max_chunk_tokens=500)
+
+    assert len(work) > 1
+    assert sum(counts.get("multiple-choice", 0) for _, counts in work) == 10
+    assert sum(counts.get("true-false", 0) for _, counts in work) == 3
+
+
+def test_no_counts_still_sends_a_prompt():
+    for question_counts in ({}, {"multiple-choice": 0}, {"multiple-choice": ""}):
+        work = chunk_work(LONG_TEXT, question_counts, max_chunk_tokens=500)
+
+        assert len(work) == 1
+        assert LONG_TEXT.startswith(work[0][0])
+        assert work[0][1] == question_counts
+
+
+def test_generate_in_chunks_without_counts_calls_the_model():
+    calls = []
+
+    def generate_chunk(chunk, counts):
+        calls.append(counts)
+        return "1. Question?\n*a) True\nb) False"
+
+    quiz_text = generate_in_chunks(LONG_TEXT, {}, generate_chunk, max_chunk_tokens=500)
+
+    assert calls == [{}]
+    assert quiz_text.startswith("1. Question?")
@@ -0,0 +1,27 @@
+import threading
+
+import pytest
+
+from jobs import BatchQueue, QueueFullError
+
+
+def test_batch_queue_rejects_items_past_max_pending():
+    release = threading.Event()
+    queue = BatchQueue(workers=1, max_items=5, max_pending=4)
+
+    def wait(job):
+        release.wait(5)
+        return "done"
+
+    first = queue.submit("test", wait, [(f"item-{i}", ()) for i in range(3)])
+    with pytest.raises(QueueFullError):
+        queue.submit("test", wait, [("a", ()), ("b", ())])
+    assert queue.stats()["pending"] == 3
+
+    release.set()
+    for _ in range(500):
+        if queue.stats()["pending"] == 0:
+            break
+        threading.Event().wait(0.01)
+    assert [job.status for job in first.jobs] == ["completed"] * 3
+    assert queue.submit("test", wait, [("a", ()), ("b", ())]).to_dict()["total"] == 2
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+from bench.corpus import make_pdf
+from pdf_extract import extract_text
+
+PDF = make_pdf(60, seed=1)
+
+
+def test_parallel_extraction_matches_sequential():
+    sequential = extract_text(PDF, workers=1)
+    parallel = extract_text(PDF, workers=2)
+
+    assert parallel == sequential
+    assert parallel.pages_read == parallel.pages_total == 60
+    assert not parallel.truncated
+
+
+def test_budgets_stop_extraction_early():
+    by_pages = extract_text(PDF, max_pages=30, workers=2)
+    by_chars = extract_text(PDF, max_chars=500, workers=2)
+
+    assert by_pages.pages_read == 30 and by_pages.truncated
+    assert len(by_chars.text) == 500 and by_chars.truncated
+    assert by_chars.text == extract_text(PDF, workers=1).text[:500]
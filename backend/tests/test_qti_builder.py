@@ -0,0 +1,118 @@
+import io
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from qti_builder import QtiBuildError, build_qti_zip
+
+PUBLIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public")
+# text2qti derives its ids from random hashes and stamps the build date; neither is part of the format
+IDENTIFIER = re.compile(r'text2qti_([a-z_-]+?)_[0-9a-f]{16,}')
+DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+QTI = "{http://www.imsglobal.org/xsd/ims_qtiasiv1p2}"
+
+
+def normalize(text):
+    return DATE.sub("DATE", IDENTIFIER.sub(r'text2qti_\1_ID', text))
+
+
+def members(zip_bytes):
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as archive:
+        return {normalize(name): normalize(archive.read(name).decode("utf-8")) for name in archive.namelist()}
+
+
+def items(zip_bytes):
+    """(question type, cardinality, indexes of the correct choices) for each item in the package."""
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as archive:
+        name = next(n for n in archive.namelist() if n.split("/")[-1] == n.split("/")[0] + ".xml")
+        root = ET.fromstring(archive.read(name))
+    result = []
+    for item in root.iter(f"{QTI}item"):
+        fields = {field.find(f"{QTI}fieldlabel").text: field.find(f"{QTI}fieldentry").text
+                  for field in item.iter(f"{QTI}qtimetadatafield")}
+        cardinality = item.find(f".//{QTI}response_lid").get("rcardinality")
+        labels = [label.get("ident") for label in item.iter(f"{QTI}response_label")]
+        condition = item.find(f".//{QTI}conditionvar")
+        negated = {v.text for n in condition.iter(f"{QTI}not") for v in n.iter(f"{QTI}varequal")}
+        correct = [labels.index(v.text) for v in condition.iter(f"{QTI}varequal") if v.text not in negated]
+        result.append((fields["question_type"], cardinality, correct))
+    return result
+
+
+def test_matches_text2qti_output():
+    with open(os.path.join(PUBLIC, "output.txt"), encoding="utf-8") as f:
+        quiz_text = f.read()
+    with open(os.path.join(PUBLIC, "output.zip"), "rb") as f:
+        expected_zip = f.read()
+    actual_zip = build_qti_zip(quiz_text)
+    expected = members(expected_zip)
+    actual = members(actual_zip)
+
+    assert sorted(actual) == sorted(expected)
+    for name in expected:
+        assert actual[name] == expected[name], name
+    # The ids are normalised away above, so check separately that each item still marks the same choices
+    assert items(actual_zip) == items(expected_zip)
+
+
+def test_true_false_and_select_all_questions():
+    quiz_text = """1. The sun is a star.
+*a) True
+b) False
+
+2. Which of these are primary colors?
+[*] Red
+[] Green
+[*] Blue
+[] Purple
+
+3. Water boils at 50 degrees Celsius at sea level.
+a) True
+*b) False"""
+
+    assert items(build_qti_zip(quiz_text)) == [
+        ("true_false_question", "Single", [0]),
+        ("multiple_answers_question", "Multiple", [0, 2]),
+        ("true_false_question", "Single", [1]),
+    ]
+
+
+def test_multi_line_question_is_one_paragraph():
+    quiz_text = """1. Read the code below.
+x = 1 < 2 & True
+What is x?
+*a) True
+b) False"""
+
+    with zipfile.ZipFile(io.BytesIO(build_qti_zip(quiz_text))) as archive:
+        name = next(n for n in archive.namelist() if n.split("/")[-1] == n.split("/")[0] + ".xml")
+        root = ET.fromstring(archive.read(name))
+    # Consecutive lines stay in one paragraph, as Markdown leaves them in text2qti
+    assert root.find(f".//{QTI}presentation/{QTI}material/{QTI}mattext").text == \
+        "<p>Read the code below.\nx = 1 &lt; 2 &amp; True\nWhat is x?</p>"
+
+
+def test_same_quiz_builds_same_identifiers():
+    with open(os.path.join(PUBLIC, "output.txt"), encoding="utf-8") as f:
+        quiz_text = f.read()
+
+    builds = []
+    for _ in range(2):
+        with zipfile.ZipFile(io.BytesIO(build_qti_zip(quiz_text))) as archive:
+            builds.append([(info.filename, info.date_time, archive.read(info)) for info in archive.infolist()])
+    assert builds[0] == builds[1]
+    assert {date_time for _, date_time, _ in builds[0]} == {(1980, 1, 1, 0, 0, 0)}
+
+
+@pytest.mark.parametrize("quiz_text", [
+    "",
+    "1. A question without choices",
+    "1. Two correct answers?\n*a) One\n*b) Two",
+    "1. Choices then prose\n*a) One\nb) Two\nSome explanation",
+])
+def test_malformed_quiz_is_rejected(quiz_text):
+    with pytest.raises(QtiBuildError):
+        build_qti_zip(quiz_text)
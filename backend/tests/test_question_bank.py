@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from question_bank import QuestionBank
+from quiz_parser import parse_questions
+
+SOURCE = "Photosynthesis converts light energy into chemical energy inside the chloroplasts of plant cells. " * 40
+COUNTS = {"multiple-choice": 4}
+TOPICS = ["chlorophyll pigment", "stomata openings", "Calvin cycle enzymes", "thylakoid membranes",
+          "starch storage", "carbon fixation", "oxygen release", "ATP synthase"]
+
+
+def quiz(topics):
+    return parse_questions("\n\n".join(
+        f"{n}. Which statement about {topic} is accurate?\na) It is absent\n*b) It is found in {topic}\n"
+        f"c) It is unrelated\nd) None of these" for n, topic in enumerate(topics, 1)))
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path))
+    bank.plan("BIO101", SOURCE, COUNTS).finish(quiz(TOPICS[:4]))
+    return bank
+
+
+def test_covered_material_reuses_stored_questions(bank):
+    plan = bank.plan("BIO101", SOURCE, COUNTS)
+
+    assert len(plan.reused) == 2
+    assert plan.remaining == {"multiple-choice": 2}
+
+
+def test_fresh_request_never_gets_stored_questions(bank):
+    plan = bank.plan("BIO101", SOURCE, COUNTS, reuse=False)
+
+    assert plan.reused == []
+    assert plan.finish([]) == []
+    assert plan.topped_up == 0
+
+
+def test_near_duplicates_are_rejected(bank):
+    plan = bank.plan("BIO101", SOURCE, COUNTS, reuse=False)
+    repeated, new = quiz([TOPICS[0], TOPICS[5]])
+
+    assert plan.check(repeated) is not None
+    assert plan.check(new) is None
+    assert plan.check(new) is not None
+
+
+def test_other_workers_see_stored_questions(bank, tmp_path):
+    plan = QuestionBank(str(tmp_path)).plan("BIO101", SOURCE, COUNTS)
+
+    assert len(plan.reused) == 2
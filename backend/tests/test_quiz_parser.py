@@ -0,0 +1,46 @@
+import pytest
+
+from quiz_parser import MULTIPLE_CHOICE, TRUE_FALSE, check_quiz, parse_questions, repair_quiz
+
+
+@pytest.mark.parametrize("choices", [
+    "*a) True\nb) False",
+    "a) False\n*b) True",
+    "*a) True.\nb) False.",
+    "a) false\n*b) TRUE",
+])
+def test_true_false_is_recognised_in_any_order(choices):
+    question, = parse_questions(f"1. The sun is a star.\n{choices}")
+
+    assert question.kind == TRUE_FALSE
+    assert question.valid
+
+
+def test_other_two_choice_questions_stay_multiple_choice():
+    question, = parse_questions("1. Pick one.\n*a) True or false\nb) Neither")
+
+    assert question.kind == MULTIPLE_CHOICE
+
+
+def test_false_first_question_counts_as_true_false():
+    questions = parse_questions("1. Water is dry.\n*a) False\nb) True\n\n2. Pick one.\n*a) A\nb) B\nc) C\nd) D")
+
+    check = check_quiz(questions, {"multiple-choice": 1, "true-false": 1})
+
+    assert check.missing == {}
+    assert len(check.keep) == 2
+
+
+def test_repair_only_requests_missing_questions():
+    requests = []
+
+    def regenerate(missing, avoid):
+        requests.append((missing, avoid))
+        return "1. Ice is cold.\n*a) True\nb) False"
+
+    questions, summary = repair_quiz("1. Pick one.\n*a) A\nb) B\n\n2. Broken\na) x\nb) y", {
+        "multiple-choice": 1, "true-false": 1}, regenerate)
+
+    assert requests == [({"true-false": 1}, ["Pick one."])]
+    assert [question.kind for question in questions] == [MULTIPLE_CHOICE, TRUE_FALSE]
+    assert summary["missing"] == {}